@@ -0,0 +1,100 @@
+"""
+Payload-size benchmark for every dashboard chart.
+
+Each chart is built the way dashboard.py builds it and the data embedded in its
+Vega-Lite spec is measured, next to the rows the chart would have shipped had
+its source frame been handed to Altair unaggregated. Pre-aggregated charts
+should stay the same size however much history there is.
+
+Run from the project directory:
+
+    python -m benchmarks.chart_payload
+    python -m benchmarks.chart_payload --years 8 50 200
+"""
+import argparse
+import json
+import altair as alt
+import polars as pl
+from datetime import timedelta
+from benchmarks.period_totals import make_daily_history
+from chart_data import date_window, monthly_totals_by_year
+from chart_helper import historical_chart, seven_day_chart, time_series_chart_maker
+
+# chart name -> (builds the chart, returns the frame an unaggregated chart would ship)
+CHARTS = {
+    'last_7_days': (lambda df1, df2: seven_day_chart(df1), lambda df1, df2: df1),
+    'last_30_days': (
+        lambda df1, df2: time_series_chart_maker(df2, 15, window=timedelta(days=30)),
+        lambda df1, df2: date_window(df2, window=timedelta(days=30))
+    ),
+    'last_90_days': (
+        lambda df1, df2: time_series_chart_maker(df2, 15, window=timedelta(days=90)),
+        lambda df1, df2: date_window(df2, window=timedelta(days=90))
+    ),
+    'last_6_months': (
+        lambda df1, df2: time_series_chart_maker(df2, 15, window=timedelta(days=180)),
+        lambda df1, df2: date_window(df2, window=timedelta(days=180))
+    ),
+    'historical': (
+        lambda df1, df2: historical_chart(monthly_totals_by_year(df2)),
+        lambda df1, df2: df2.select('date_ending', 'migrants_arrived')
+    ),
+}
+
+
+def payload(chart):
+    """
+    Measures the data embedded in a chart's Vega-Lite spec.
+
+    Args:
+        chart: an alt.Chart
+    Returns:
+        tuple of (rows, bytes of the serialised datasets)
+    """
+
+    datasets = chart.to_dict().get('datasets', {})
+    rows = sum(len(values) for values in datasets.values())
+    return rows, len(json.dumps(datasets))
+
+
+def load_frames(years=None):
+    """
+    Loads the frames the dashboard charts are built from.
+
+    Args:
+        years: years of synthetic daily history, or None to read the database
+    Returns:
+        tuple of (7-day frame, daily frame), latest first
+    """
+
+    if years is None:
+        from data_access import query
+        df1 = query('SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_7_days;')
+        df2 = query('SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_daily;')
+        return df1, df2
+
+    df2 = make_daily_history(years).with_columns(
+        (pl.col('migrants_arrived') // 45).alias('boats_arrived')
+    )
+    return df2.limit(7), df2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--years', type=int, nargs='+', help='synthetic history sizes instead of the database')
+    args = parser.parse_args()
+
+    print(f"{'source':>10} {'chart':<15} {'rows':>6} {'bytes':>9} {'raw_rows':>9} {'raw_bytes':>10}")
+    for years in args.years or [None]:
+        df1, df2 = load_frames(years)
+        source = 'database' if years is None else f"{years}y"
+        for name, (build, raw) in CHARTS.items():
+            rows, size = payload(build(df1, df2))
+            # unaggregated daily rows pass Altair's 5000 row limit after ~13 years
+            with alt.data_transformers.enable('default', max_rows=None):
+                raw_rows, raw_size = payload(alt.Chart(raw(df1, df2)).mark_point())
+            print(f"{source:>10} {name:<15} {rows:>6} {size:>9} {raw_rows:>9} {raw_size:>10}")
+
+
+if __name__ == "__main__":
+    main()
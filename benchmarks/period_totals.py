@@ -0,0 +1,89 @@
+"""
+Micro-benchmark comparing the dashboard's original eight filter/sum passes with
+period_totals.compute_period_totals on synthetic daily histories.
+
+Run from the project directory:
+
+    python -m benchmarks.period_totals
+"""
+import argparse
+import random
+import timeit
+import polars as pl
+from datetime import date, timedelta
+from period_totals import DEFAULT_PERIODS, compute_period_totals
+
+
+def make_daily_history(years, seed=0):
+    """
+    Builds a synthetic daily history ending on 8 January 2026.
+
+    Args:
+        years: number of years of history
+        seed: random seed
+    Returns:
+        pl.DataFrame with date_ending and migrants_arrived columns
+    """
+
+    rng = random.Random(seed)
+    end = date(2026, 1, 8)
+    days = int(years * 365)
+    return pl.DataFrame({
+        'date_ending': [end - timedelta(days=i) for i in range(days)],
+        'migrants_arrived': [rng.randint(0, 800) for _ in range(days)],
+    })
+
+
+def eight_pass_totals(df2):
+    """
+    The original dashboard.py approach: one filter and sum per metric.
+    """
+
+    latest_date = df2['date_ending'].max()
+    start_of_week = latest_date - timedelta(days=latest_date.weekday())
+    latest_month_start = date(latest_date.year, latest_date.month, 1)
+    prev_month_end = latest_month_start - timedelta(days=1)
+    prev_month_start = date(prev_month_end.year, prev_month_end.month, 1)
+    comparison_date = latest_date - timedelta(days=365)
+
+    def total(mask):
+        return df2.filter(mask).select(pl.col('migrants_arrived').sum()).item()
+
+    d = pl.col('date_ending')
+    return {
+        'day': (total(d == latest_date), total(d == comparison_date)),
+        'week': (total(d >= start_of_week), total((d >= start_of_week - timedelta(days=7)) & (d < start_of_week))),
+        'month': (total(d >= latest_month_start), total((d >= prev_month_start) & (d <= prev_month_end))),
+        'year': (total(d.dt.year() == latest_date.year), total(d.dt.year() == latest_date.year - 1)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--years', type=int, nargs='+', default=[8, 50, 200])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'years':>6} {'rows':>8} {'eight_pass_ms':>14} {'single_pass_ms':>15} {'extended_ms':>12}")
+    for years in args.years:
+        df = make_daily_history(years)
+
+        # both approaches must agree before their timings mean anything
+        expected = eight_pass_totals(df)
+        actual = compute_period_totals(df)
+        assert {k: tuple(v) for k, v in actual.items()} == expected, (actual, expected)
+
+        extended = list(DEFAULT_PERIODS) + ['quarter', 'financial_year', 'rolling_28_days']
+        timings = [
+            min(timeit.repeat(fn, number=1, repeat=args.repeat)) * 1000
+            for fn in (
+                lambda: eight_pass_totals(df),
+                lambda: compute_period_totals(df),
+                lambda: compute_period_totals(df, periods=extended),
+            )
+        ]
+        print(f"{years:>6} {df.height:>8} {timings[0]:>14.2f} {timings[1]:>15.2f} {timings[2]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
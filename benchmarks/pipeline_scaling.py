@@ -0,0 +1,333 @@
+"""
+Benchmark of the ingest pipeline stage by stage on synthetic multi-decade releases.
+
+A series of weekly SB_01 (daily) and SB_02 (weekly) releases is generated with
+the column layout of the government workbooks, each one restating the whole
+history and revising a fraction of the figures already published. Every release
+is written both as an .ods workbook and as parquet, then replayed the way
+rebuild.py replays the archive. Parsing, merging, the latest table refresh and
+the dashboard's metric computations are timed separately.
+
+Results are printed as a table and, with --output, written as JSON alongside
+the commit and library versions, so runs on different commits can be compared.
+
+Run from the project directory:
+
+    python -m benchmarks.pipeline_scaling
+    python -m benchmarks.pipeline_scaling --years 8 30 --releases 4 --revision-rate 0.01 --output bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import zipfile
+import duckdb
+import polars as pl
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from xml.sax.saxutils import escape
+from chart_data import date_window, monthly_totals_by_year
+from ingest_daily_data import merge_daily_data, prepare_daily_data
+from ingest_manifest import ensure_meta_tables
+from ingest_weekly_data import merge_weekly_data, prepare_weekly_data
+from kpi_summary import KPI_SUMMARY_SQL, refresh_kpi_summary
+from latest_tables import refresh_latest_tables
+from period_totals import compute_period_totals
+from release_loader import RELEASE_SHEETS, release_date
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent
+QUERIES_PATH = PROJECT_PATH / 'queries'
+LAST_RELEASE = date(2026, 1, 9)
+
+ODS_MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+    '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '</manifest:manifest>'
+)
+ODS_CONTENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content'
+    ' xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+    ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"'
+    ' office:version="1.2"><office:body><office:spreadsheet>'
+)
+ODS_CONTENT_TAIL = '</office:spreadsheet></office:body></office:document-content>'
+
+
+def make_releases(years, releases, revision_rate, seed=0):
+    """
+    Builds a weekly series of releases ending on 9 January 2026. Each release
+    covers every day up to the day before it was published, starting `years`
+    years before the first release, and revises `revision_rate` of the days
+    the previous release had already published.
+
+    Args:
+        years: years of history in the first release
+        releases: number of releases
+        revision_rate: fraction of published days revised by each release
+        seed: random seed
+    Returns:
+        list of (publication date, dict of sheet name to pl.DataFrame), oldest first
+    """
+
+    rng = random.Random(seed)
+    first_release = LAST_RELEASE - timedelta(weeks=releases - 1)
+    start = first_release - timedelta(days=int(years * 365))
+
+    def figures():
+        migrants = rng.randint(0, 800)
+        boats = migrants // 45
+        return [migrants, boats, rng.randint(0, boats)]
+
+    values = {}
+    series = []
+    for i in range(releases):
+        published = first_release + timedelta(weeks=i)
+
+        # revise some of what is already out, then add the days since
+        for day in rng.sample(sorted(values), int(len(values) * revision_rate)):
+            values[day] = figures()
+        day = start + timedelta(days=len(values))
+        while day < published:
+            values[day] = figures()
+            day += timedelta(days=1)
+
+        days = sorted(values)
+        daily = pl.DataFrame({
+            'Date': days,
+            'Migrants arrived': [values[d][0] for d in days],
+            'Boats arrived': [values[d][1] for d in days],
+            'Boats arrived - involved in uncontrolled landings': [values[d][2] for d in days],
+            'Notes': pl.Series([None] * len(days), dtype=pl.String()),
+        })
+
+        # weeks end on a sunday, and only complete weeks are published
+        weekly = (
+            daily
+            .with_columns((pl.col('Date') + pl.duration(days=7 - pl.col('Date').dt.weekday())).alias('Week ending'))
+            .filter(pl.col('Week ending') < published)
+            .group_by('Week ending')
+            .agg(pl.col('Migrants arrived', 'Boats arrived', 'Boats arrived - involved in uncontrolled landings').sum())
+            .sort('Week ending')
+            .with_columns(
+                (pl.col('Migrants arrived') // 3).alias('Migrants prevented'),
+                (pl.col('Boats arrived') // 2).alias('Events prevented'),
+                pl.lit(None, dtype=pl.String()).alias('Notes'),
+            )
+        )
+        series.append((published, {'SB_01': daily, 'SB_02': weekly}))
+
+    return series
+
+
+def _ods_cell(value):
+    if value is None:
+        return '<table:table-cell/>'
+    if isinstance(value, date):
+        return f'<table:table-cell office:value-type="date" office:date-value="{value.isoformat()}"/>'
+    if isinstance(value, (int, float)):
+        return f'<table:table-cell office:value-type="float" office:value="{value}"/>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+
+def write_ods(path, sheets):
+    """
+    Writes dataframes as the sheets of a minimal OpenDocument spreadsheet, one
+    header row of column names followed by the data.
+
+    Args:
+        path: output .ods path
+        sheets: dict of sheet name to pl.DataFrame
+    Returns:
+        None
+    """
+
+    parts = [ODS_CONTENT_HEAD]
+    for name, df in sheets.items():
+        parts.append(f'<table:table table:name="{escape(name)}">')
+        for row in [tuple(df.columns)] + df.rows():
+            parts.append('<table:table-row>' + ''.join(_ods_cell(v) for v in row) + '</table:table-row>')
+        parts.append('</table:table>')
+    parts.append(ODS_CONTENT_TAIL)
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        # the mimetype must be the first entry and stored uncompressed
+        z.writestr(zipfile.ZipInfo('mimetype'), 'application/vnd.oasis.opendocument.spreadsheet', zipfile.ZIP_STORED)
+        z.writestr('META-INF/manifest.xml', ODS_MANIFEST)
+        z.writestr('content.xml', ''.join(parts))
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def run_scenario(workdir, years, releases, revision_rate, seed=0):
+    """
+    Generates, writes, parses and replays one set of releases and times each
+    stage.
+
+    Args:
+        workdir: directory for the releases and database
+        years: years of history in the first release
+        releases: number of releases
+        revision_rate: fraction of published days revised by each release
+        seed: random seed
+    Returns:
+        dict of parameters, row counts, sizes and timings in milliseconds
+    """
+
+    workdir = Path(workdir)
+    series, generate_ms = _timed(make_releases, years, releases, revision_rate, seed)
+
+    write_ods_ms, write_parquet_ms, parse_ods_ms, parse_parquet_ms = [], [], [], []
+    parsed = []
+    for published, sheets in series:
+        ods_path = workdir / f"{published:%d_%B_%Y}_Small_boats_-_time_series.ods"
+        _, elapsed = _timed(write_ods, ods_path, sheets)
+        write_ods_ms.append(elapsed)
+        parquet_paths = {name: workdir / f"{published.isoformat()}_{name}.parquet" for name in RELEASE_SHEETS}
+        start = time.perf_counter()
+        for name, path in parquet_paths.items():
+            sheets[name].write_parquet(path)
+        write_parquet_ms.append((time.perf_counter() - start) * 1000)
+
+        # the two reads release_loader chooses between
+        from_ods, elapsed = _timed(pl.read_ods, source=ods_path, sheet_name=RELEASE_SHEETS)
+        parse_ods_ms.append(elapsed)
+        from_parquet, elapsed = _timed(lambda: {name: pl.read_parquet(path) for name, path in parquet_paths.items()})
+        parse_parquet_ms.append(elapsed)
+        assert {n: df.height for n, df in from_ods.items()} == {n: df.height for n, df in from_parquet.items()}
+        parsed.append((ods_path, from_parquet))
+
+    con = duckdb.connect(str(workdir / 'bench.duckdb'))
+    con.execute((QUERIES_PATH / 'create_raw_table_statements.sql').read_text())
+    ensure_meta_tables(con)
+
+    # replay in publication order, as rebuild.py does
+    merge_ms = []
+    for ods_path, sheets in parsed:
+        as_of = release_date(ods_path)
+        start = time.perf_counter()
+        for sheet_name, prepare, merge in [
+            ('SB_01', prepare_daily_data, merge_daily_data),
+            ('SB_02', prepare_weekly_data, merge_weekly_data),
+        ]:
+            sheet = sheets[sheet_name].with_columns(pl.lit(ods_path.name).alias('source'))
+            merge(con, prepare([sheet], as_of), as_of)
+        merge_ms.append((time.perf_counter() - start) * 1000)
+
+    # the 7-day page is not part of a release, stand in the last week of daily figures
+    con.execute("""
+    INSERT INTO raw.migrants_arrived_7_days BY NAME
+    SELECT * EXCLUDE (row_hash) FROM raw.migrants_arrived_daily
+    WHERE is_current = true ORDER BY date_ending DESC LIMIT 7
+    """)
+
+    start = time.perf_counter()
+    refresh_latest_tables(con)
+    refresh_kpi_summary(con)
+    refresh_ms = (time.perf_counter() - start) * 1000
+
+    # what the dashboard computes from the latest tables
+    _, kpi_sql_ms = _timed(lambda: con.execute(KPI_SUMMARY_SQL).fetchall())
+    daily = con.execute(
+        "SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_daily ORDER BY date_ending DESC"
+    ).pl().set_sorted('date_ending', descending=True)
+    _, period_totals_ms = _timed(compute_period_totals, daily)
+    _, chart_data_ms = _timed(
+        lambda: (monthly_totals_by_year(daily), date_window(daily, window=timedelta(days=180)))
+    )
+
+    raw_rows, revisions = con.execute(
+        "SELECT (SELECT count(*) FROM raw.migrants_arrived_daily), (SELECT count(*) FROM meta.revisions WHERE change = 'revised')"
+    ).fetchone()
+    con.close()
+
+    last_ods = parsed[-1][0]
+    return {
+        'years': years,
+        'releases': releases,
+        'revision_rate': revision_rate,
+        'seed': seed,
+        'daily_rows': series[-1][1]['SB_01'].height,
+        'weekly_rows': series[-1][1]['SB_02'].height,
+        'raw_daily_rows': raw_rows,
+        'revisions_recorded': revisions,
+        'ods_bytes': last_ods.stat().st_size,
+        'parquet_bytes': sum((workdir / f"{series[-1][0].isoformat()}_{n}.parquet").stat().st_size for n in RELEASE_SHEETS),
+        'timings_ms': {
+            'generate': generate_ms,
+            'write_ods': statistics.median(write_ods_ms),
+            'write_parquet': statistics.median(write_parquet_ms),
+            'parse_ods': statistics.median(parse_ods_ms),
+            'parse_parquet': statistics.median(parse_parquet_ms),
+            'merge_first': merge_ms[0],
+            'merge_median': statistics.median(merge_ms[1:] or merge_ms),
+            'refresh': refresh_ms,
+            'kpi_sql': kpi_sql_ms,
+            'period_totals': period_totals_ms,
+            'chart_data': chart_data_ms,
+        },
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=PROJECT_PATH, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--years', type=int, nargs='+', default=[8, 30])
+    parser.add_argument('--releases', type=int, default=4)
+    parser.add_argument('--revision-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=Path, help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    # all-empty Notes columns make every ods read warn
+    logging.getLogger('fastexcel').setLevel(logging.ERROR)
+
+    # one small untimed run, so the first scenario does not pay for warming up duckdb and polars
+    with tempfile.TemporaryDirectory() as tmp:
+        run_scenario(tmp, 1, 2, args.revision_rate, args.seed)
+
+    results = []
+    columns = ['parse_ods', 'parse_parquet', 'merge_first', 'merge_median', 'refresh', 'kpi_sql', 'period_totals', 'chart_data']
+    print(f"{'years':>5} {'rows':>7} " + " ".join(f"{c + '_ms':>16}" for c in columns))
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run_scenario(tmp, years, args.releases, args.revision_rate, args.seed)
+        results.append(result)
+        timings = result['timings_ms']
+        print(f"{years:>5} {result['daily_rows']:>7} " + " ".join(f"{timings[c]:>16.1f}" for c in columns))
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            'benchmark': 'pipeline_scaling',
+            'commit': _commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'polars': pl.__version__,
+            'duckdb': duckdb.__version__,
+            'results': results,
+        }, indent=2))
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of current-row reads against raw SCD-2 tables as their history grows.
+
+A synthetic daily table is built with every day revised `versions` times, the
+revisions landing in begin_date order the way successive ingests append them,
+so current rows end up scattered through the history. The same table is then
+reclustered with scd2.cluster_scd2, and the time that takes is reported as the
+extra cost a merge pays when it passes scd2.RECLUSTER_FRACTION. Both layouts carry the key index from
+queries/create_raw_table_statements.sql. Current rows are read with the query
+that builds latest.migrants_arrived_daily, and the full history of one date
+through the key index.
+
+Run from the project directory:
+
+    python -m benchmarks.raw_layout
+    python -m benchmarks.raw_layout --versions 1 10 100 --days 2930
+"""
+import argparse
+import statistics
+import tempfile
+import time
+import duckdb
+from pathlib import Path
+from latest_tables import latest_table_sql
+from scd2 import cluster_scd2
+
+QUERIES_PATH = Path(__file__).resolve().parent.parent / 'queries'
+TABLE_NAME = "raw.migrants_arrived_daily"
+
+CURRENT_SQL = latest_table_sql('latest.migrants_arrived_daily')
+HISTORY_SQL = f"SELECT * FROM {TABLE_NAME} WHERE date_ending = DATE '2020-06-01'"
+
+
+def build_history(con, days, versions):
+    """
+    Fills the daily table with `days` keys and `versions` versions of each, one
+    revision a week, appended in begin_date order.
+
+    Args:
+        con: an open read-write duckdb connection with the raw tables created
+        days: number of distinct dates
+        versions: versions per date, the last one current
+    Returns:
+        None
+    """
+
+    con.execute(f"""
+    INSERT INTO {TABLE_NAME} BY NAME
+    SELECT
+        row_number() OVER (ORDER BY begin_date, date_ending) AS record_id,
+        *
+    FROM (
+        SELECT
+            DATE '2018-01-01' + CAST(d AS INTEGER) AS date_ending,
+            CAST((d * 37 + v) % 800 AS INTEGER) AS migrants_arrived,
+            CAST((d * 37 + v) % 800 // 45 AS INTEGER) AS boats_arrived,
+            0 AS boats_arrived_involved_in_uncontrolled_landings,
+            'synthetic' AS source,
+            v = {versions} - 1 AS is_current,
+            DATE '2018-01-01' + CAST(d + 7 * v AS INTEGER) AS begin_date,
+            CASE WHEN v < {versions} - 1 THEN DATE '2018-01-01' + CAST(d + 7 * v + 6 AS INTEGER) END AS end_date
+        FROM range({days}) AS days(d), range({versions}) AS revisions(v)
+    )
+    ORDER BY begin_date, date_ending
+    """)
+
+
+def time_query(con, sql, repeat):
+    # median of repeated runs, in milliseconds, materialised the way data_access does
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        con.execute(sql).pl()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--versions', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--days', type=int, default=2930)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'versions':>8} {'rows':>9} {'layout':<10} {'current_ms':>10} {'history_ms':>11} {'cluster_ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for versions in args.versions:
+            for layout in ('appended', 'clustered'):
+                db_path = Path(tmp) / f"{layout}_{versions}.duckdb"
+                con = duckdb.connect(str(db_path))
+                con.execute((QUERIES_PATH / 'create_raw_table_statements.sql').read_text())
+                build_history(con, args.days, versions)
+                cluster_ms = float('nan')
+                if layout == 'clustered':
+                    start = time.perf_counter()
+                    cluster_scd2(con, TABLE_NAME, ['date_ending'])
+                    cluster_ms = (time.perf_counter() - start) * 1000
+                con.execute("CHECKPOINT")
+
+                rows = con.execute(f"SELECT count(*) FROM {TABLE_NAME}").fetchone()[0]
+                current_ms = time_query(con, CURRENT_SQL, args.repeat)
+                history_ms = time_query(con, HISTORY_SQL, args.repeat)
+                print(f"{versions:>8} {rows:>9} {layout:<10} {current_ms:>10.2f} {history_ms:>11.2f} {cluster_ms:>11.1f}")
+                con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Startup-time benchmark for the dashboard and the ingest entry points.
+
+Each entry point is started in a fresh interpreter under `python -X importtime`,
+so nothing is shared between runs. The median wall time is checked against a
+per entry point budget and the heaviest packages it imported are listed, which is
+usually enough to spot a heavy dependency that crept back into module load.
+
+Run from the project directory:
+
+    python -m benchmarks.startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_PATH = Path(__file__).resolve().parent.parent
+
+# entry point name -> (code run by the interpreter, wall time budget in ms)
+ENTRY_POINTS = {
+    'execute_all': ("import execute_all", 150),
+    'ingest_7_day_data': ("import ingest_7_day_data", 900),
+    'ingest_daily_data': ("import ingest_daily_data", 900),
+    'ingest_weekly_data': ("import ingest_weekly_data", 900),
+    'rebuild': ("import rebuild", 900),
+    'dashboard': ("import runpy; runpy.run_path('dashboard.py')", 2500),
+}
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into the cumulative import time of each
+    top-level package, leaving out the interpreter's own start up imports. A
+    package imported in several places is counted at its slowest import.
+
+    Args:
+        stderr: stderr of a `python -X importtime` run
+    Returns:
+        dict of package name to cumulative import time in microseconds
+    """
+
+    lines = [
+        line[len('import time:'):].split('|')
+        for line in stderr.splitlines()
+        if line.startswith('import time:') and 'cumulative' not in line
+    ]
+
+    # everything imported before `site` has finished is interpreter start up
+    names = [name.strip() for _, _, name in lines]
+    if 'site' in names:
+        lines = lines[names.index('site') + 1:]
+
+    packages = {}
+    for _, cumulative, name in lines:
+        package = name.strip().split('.')[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative))
+    return packages
+
+
+def run_entry_point(code):
+    """
+    Runs an entry point in a fresh interpreter.
+
+    Args:
+        code: python source passed to `python -c`
+    Returns:
+        tuple of (wall time in ms, dict of package import times in microseconds)
+    """
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', code],
+        cwd=PROJECT_PATH,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{completed.stderr[-2000:]}")
+    return elapsed, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('entry_points', nargs='*', metavar='entry_point', help=f"any of {', '.join(ENTRY_POINTS)}")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5, help='heaviest packages to list')
+    parser.add_argument('--no-enforce', action='store_true', help='report only, never fail')
+    args = parser.parse_args()
+    unknown = set(args.entry_points) - set(ENTRY_POINTS)
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(sorted(unknown))}")
+
+    over_budget = []
+    print(f"{'entry_point':<20} {'median_ms':>10} {'budget_ms':>10}  heaviest packages (ms)")
+    for name in args.entry_points or ENTRY_POINTS:
+        code, budget = ENTRY_POINTS[name]
+
+        # one untimed run so the first measurement is not paying for a cold page cache
+        run_entry_point(code)
+        runs = [run_entry_point(code) for _ in range(args.repeat)]
+
+        median = statistics.median(elapsed for elapsed, _ in runs)
+        imports = runs[-1][1]
+        imports.pop(name, None)
+        slowest = sorted(imports, key=imports.get, reverse=True)[:args.top]
+        status = '' if median <= budget else ' OVER'
+        print(
+            f"{name:<20} {median:>10.0f} {budget:>10}{status}  "
+            + ", ".join(f"{module} {imports[module] / 1000:.0f}" for module in slowest)
+        )
+        if median > budget:
+            over_budget.append(name)
+
+    if over_budget and not args.no_enforce:
+        sys.exit(f"Startup budget exceeded by: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
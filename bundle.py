@@ -0,0 +1,253 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+import polars as pl
+
+BUNDLE_DIR = Path('bundle')
+BUNDLE_ENV_VAR = 'DASHBOARD_BUNDLE'
+MANIFEST_NAME = 'manifest.json'
+# older versions are kept for readers still holding the previous manifest
+KEEP_VERSIONS = 3
+REVISION_DAYS = 7
+
+# bundle file -> (latest table, key column), written without the surrogate record_id
+BUNDLE_TABLES = {
+    'daily.parquet': ('latest.migrants_arrived_daily', 'date_ending'),
+    'seven_day.parquet': ('latest.migrants_arrived_7_days', 'date_ending'),
+    'weekly.parquet': ('latest.migrants_arrived_weekly', 'week_ending'),
+}
+
+
+class Bundle(NamedTuple):
+    version: str
+    created_at: datetime
+    kpi: Optional[dict]
+    daily: pl.DataFrame
+    seven_day: pl.DataFrame
+    weekly: pl.DataFrame
+    monthly_totals: pl.DataFrame
+    revisions: pl.DataFrame
+
+    def recent_revisions(self, until, days=REVISION_DAYS):
+        """
+        Lists the daily figures revised by releases ingested in the `days` days
+        up to until, like revisions.read_recent_revisions.
+
+        Args:
+            until: last ingest date to include
+            days: length of the window in days
+        Returns:
+            pl.DataFrame, newest first
+        """
+
+        return self.revisions.filter(pl.col('as_of').is_between(until - timedelta(days=days), until, closed='right'))
+
+
+def _bundle_frames(con):
+    import duckdb
+    from chart_data import monthly_totals_by_year
+    from kpi_summary import KPI_SUMMARY_SQL, KPI_SUMMARY_TABLE
+    from revisions import REVISED_SQL, REVISIONS_SCHEMA
+
+    frames = {
+        name: con.execute(
+            f"SELECT COLUMNS(c -> c != 'record_id') FROM {table_name} ORDER BY {key_column} DESC"
+        ).pl()
+        for name, (table_name, key_column) in BUNDLE_TABLES.items()
+    }
+    frames['monthly_totals.parquet'] = monthly_totals_by_year(frames['daily.parquet'])
+
+    # every revision is kept, the dashboard picks the recent ones, so the
+    # bundle only changes when the data does
+    try:
+        frames['revisions.parquet'] = con.execute(REVISED_SQL, ['raw.migrants_arrived_daily']).pl()
+    except duckdb.CatalogException:
+        # the database predates the revisions table
+        frames['revisions.parquet'] = pl.DataFrame(schema=REVISIONS_SCHEMA)
+
+    try:
+        kpi = con.execute(f"SELECT * FROM {KPI_SUMMARY_TABLE}").pl()
+    except duckdb.CatalogException:
+        kpi = con.execute(KPI_SUMMARY_SQL).pl()
+
+    return frames, kpi.row(0, named=True) if not kpi.is_empty() else None
+
+
+def write_bundle(con, bundle_dir=BUNDLE_DIR):
+    """
+    Writes the figures the dashboard shows to a new version of the bundle: the
+    latest tables, the monthly totals behind the historical chart and every
+    revised daily figure as zstd compressed parquet, and the
+    headline metrics as json. The version is the hash of the files' content,
+    so an ingest that changed nothing visible writes nothing new.
+
+    Nothing reads the version until publish_bundle points the manifest at it.
+
+    Args:
+        con: an open duckdb connection
+        bundle_dir: directory holding the bundle versions and the manifest
+    Returns:
+        dict, the manifest to publish
+    """
+
+    frames, kpi = _bundle_frames(con)
+
+    contents = {}
+    for name, df in frames.items():
+        buffer = io.BytesIO()
+        df.write_parquet(buffer, compression='zstd')
+        contents[name] = buffer.getvalue()
+    contents['kpi.json'] = json.dumps(kpi, default=str, indent=2).encode()
+
+    digest = hashlib.sha256()
+    for name in sorted(contents):
+        digest.update(name.encode())
+        digest.update(contents[name])
+    version = digest.hexdigest()[:16]
+
+    version_dir = Path(bundle_dir) / version
+    if version_dir.exists():
+        logging.info(f"Bundle {version} is already written")
+    else:
+        # write next to the final directory and rename it into place once complete
+        partial_dir = Path(bundle_dir) / f"{version}.partial"
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        partial_dir.mkdir(parents=True)
+        for name, content in contents.items():
+            (partial_dir / name).write_bytes(content)
+        os.replace(partial_dir, version_dir)
+        logging.info(f"Wrote bundle -> {version_dir}")
+
+    return {
+        'version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'files': {
+            name: {'sha256': hashlib.sha256(content).hexdigest(), 'bytes': len(content)}
+            for name, content in sorted(contents.items())
+        },
+    }
+
+
+def publish_bundle(manifest, bundle_dir=BUNDLE_DIR):
+    """
+    Points the bundle manifest at a version written by write_bundle, with an
+    atomic rename, removes all but the KEEP_VERSIONS newest versions and
+    sweeps up versions left partially written.
+
+    Args:
+        manifest: output of write_bundle
+        bundle_dir: directory holding the bundle versions and the manifest
+    Returns:
+        None
+    """
+
+    bundle_dir = Path(bundle_dir)
+    manifest_path = bundle_dir / MANIFEST_NAME
+    partial_path = bundle_dir / f"{MANIFEST_NAME}.partial"
+    partial_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(partial_path, manifest_path)
+    logging.info(f"Published bundle {manifest['version']} -> {manifest_path}")
+
+    # partial directories are left behind by writes that died before their rename
+    for p in bundle_dir.glob('*.partial'):
+        if p.is_dir():
+            shutil.rmtree(p, ignore_errors=True)
+
+    versions = sorted(
+        (p for p in bundle_dir.iterdir() if p.is_dir() and p.suffix != '.partial' and p.name != manifest['version']),
+        key=lambda p: p.stat().st_mtime_ns, reverse=True
+    )
+    for stale in versions[KEEP_VERSIONS - 1:]:
+        shutil.rmtree(stale)
+
+
+@lru_cache(maxsize=2)
+def _load_version(bundle_dir, version, created_at):
+    version_dir = Path(bundle_dir) / version
+    # parquet is memory-mapped, and each version is read once per process
+    frames = {name: pl.read_parquet(version_dir / name, memory_map=True) for name in BUNDLE_TABLES}
+    kpi = json.loads((version_dir / 'kpi.json').read_text())
+    if kpi is not None:
+        kpi = {k: date.fromisoformat(v) if k.endswith('_date') else v for k, v in kpi.items()}
+
+    return Bundle(
+        version=version,
+        created_at=datetime.fromisoformat(created_at),
+        kpi=kpi,
+        daily=frames['daily.parquet'].set_sorted('date_ending', descending=True),
+        seven_day=frames['seven_day.parquet'],
+        weekly=frames['weekly.parquet'],
+        monthly_totals=pl.read_parquet(version_dir / 'monthly_totals.parquet', memory_map=True),
+        revisions=pl.read_parquet(version_dir / 'revisions.parquet', memory_map=True),
+    )
+
+
+def bundle_dir_from_env():
+    """
+    Returns the bundle directory the dashboard should serve from, set with
+    DASHBOARD_BUNDLE=<dir>, or None to query the database.
+
+    Returns:
+        str, or None
+    """
+
+    return os.environ.get(BUNDLE_ENV_VAR) or None
+
+
+def load_bundle(bundle_dir=BUNDLE_DIR):
+    """
+    Reads the published version of the bundle. Only the small manifest is read
+    on each call, a version's files are read once per process and shared by
+    every session, and a newly published version is picked up on the next call.
+
+    The returned dataframes are shared between sessions and must not be mutated.
+
+    Args:
+        bundle_dir: directory holding the bundle versions and the manifest
+    Returns:
+        Bundle
+    Raises:
+        FileNotFoundError: when no bundle has been published yet
+    """
+
+    manifest = json.loads((Path(bundle_dir) / MANIFEST_NAME).read_text())
+    return _load_version(str(bundle_dir), manifest['version'], manifest['created_at'])
+
+
+def export_bundle(db_path='migrant_crossings_db.duckdb', bundle_dir=BUNDLE_DIR):
+    """
+    Writes and publishes a bundle from the database, e.g. for a database that
+    was ingested before bundles existed.
+
+    Args:
+        db_path: path to the duckdb database file
+        bundle_dir: directory holding the bundle versions and the manifest
+    Returns:
+        dict, the published manifest
+    """
+
+    import duckdb
+
+    # setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        manifest = write_bundle(con, bundle_dir)
+    finally:
+        con.close()
+    publish_bundle(manifest, bundle_dir)
+    return manifest
+
+if __name__ == "__main__":
+    export_bundle()
@@ -0,0 +1,87 @@
+import polars as pl
+from datetime import timedelta
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+TIME_SERIES_METRICS = ['migrants_arrived', 'boats_arrived']
+
+
+def monthly_totals_by_year(df, date_column='date_ending', value_column='migrants_arrived'):
+    """
+    Sums a daily series to one row per calendar month and year, which is the
+    granularity the historical chart displays, so the browser receives a few
+    hundred points rather than every daily row.
+
+    Args:
+        df: daily data
+        date_column: name of the date column
+        value_column: name of the column to sum
+    Returns:
+        pl.DataFrame with year, month_number, month and value_column columns,
+        ordered by year and month
+    """
+
+    d = pl.col(date_column)
+    return (
+        df.lazy()
+        .group_by(
+            d.dt.year().alias('year'),
+            d.dt.month().alias('month_number')
+        )
+        .agg(pl.col(value_column).sum())
+        .with_columns(
+            pl.col('year').cast(pl.String()),
+            pl.col('month_number').replace_strict(range(1, 13), MONTH_NAMES).alias('month')
+        )
+        .sort('year', 'month_number')
+        .select('year', 'month_number', 'month', value_column)
+        .collect()
+    )
+
+
+def date_window(df, since=None, until=None, window=None, date_column='date_ending'):
+    """
+    Returns the rows dated within [since, until], found by binary search on the
+    date column rather than by position, so the slice stays correct when days
+    are missing. Frames sorted by date in either direction are sliced without
+    copying; anything else is sorted first.
+
+    Args:
+        df: data with a date column
+        since: first date to include, defaults to until - window + 1 day
+        until: last date to include, defaults to the latest date in df
+        window: optional timedelta covered by the window, ending on until
+        date_column: name of the date column
+    Returns:
+        pl.DataFrame, latest first when df was sorted that way and oldest first
+        otherwise
+    """
+
+    dates = df[date_column]
+    if dates.is_empty():
+        return df
+
+    # frames flagged as sorted (e.g. with set_sorted) skip the order check
+    flags = dates.flags
+    if flags['SORTED_ASC'] or flags['SORTED_DESC']:
+        descending = flags['SORTED_DESC']
+    elif dates.is_sorted(descending=True):
+        descending = True
+    elif dates.is_sorted():
+        descending = False
+    else:
+        df, descending = df.sort(date_column), False
+        dates = df[date_column]
+
+    until = until or (dates[0] if descending else dates[-1])
+    if since is None and window is not None:
+        since = until - window + timedelta(days=1)
+    since = since or (dates[-1] if descending else dates[0])
+
+    if descending:
+        start = dates.search_sorted(until, side='left', descending=True)
+        end = dates.search_sorted(since, side='right', descending=True)
+    else:
+        start = dates.search_sorted(since, side='left')
+        end = dates.search_sorted(until, side='right')
+
+    return df.slice(start, max(end - start, 0))
@@ -1,19 +1,34 @@
-import streamlit as st
 import altair as alt
+from chart_data import MONTH_NAMES, TIME_SERIES_METRICS, date_window
+from instrumentation import instrumented
 
-def time_series_chart_maker(data, time_series: None, tickCount):
+@instrumented()
+def time_series_chart_maker(data, tickCount, since=None, until=None, window=None):
     """
-    _docstring
-    :param data:
-    :param time_series:
-    :param tickCount:
-    :return:
+    Line chart of migrants and boats arrived over a date window. The window is
+    sliced by date, not by row count, so missing days never pull older data in,
+    and only the window's date and metric columns are sent to the browser, one
+    row per day. The metrics are folded into one line each by the browser,
+    which keeps the payload half the size of sending them in long format.
+
+    Args:
+        data: daily data with date_ending, migrants_arrived and boats_arrived
+            columns, ideally sorted by date_ending
+        tickCount: number of x axis ticks
+        since: first date to plot, defaults to until - window + 1 day
+        until: last date to plot, defaults to the latest date in data
+        window: optional timedelta to plot, ending on until
+    Returns:
+        alt.Chart
     """
 
     chart = (
-        alt.Chart(data.limit(time_series))
+        alt.Chart(
+            date_window(data, since=since, until=until, window=window)
+            .select('date_ending', *TIME_SERIES_METRICS)
+        )
         .transform_fold(
-            ["migrants_arrived", "boats_arrived"],
+            TIME_SERIES_METRICS,
             as_=["metric", "value"]
         )
         .mark_line(point=True)
@@ -43,4 +58,89 @@ def time_series_chart_maker(data, time_series: None, tickCount):
         ).configure_legend(orient="right")
     )
 
-    return chart
\ No newline at end of file
+    return chart
+
+
+@instrumented()
+def seven_day_chart(data):
+    """
+    Bar chart of migrants arrived on each of the last 7 days.
+
+    Args:
+        data: one row per day with date_ending and migrants_arrived columns
+    Returns:
+        alt.Chart
+    """
+
+    return (
+        alt.Chart(data.select('date_ending', 'migrants_arrived'))
+        .mark_bar()
+        .encode(
+            alt.X(
+                "date_ending:N",
+                timeUnit="yearmonthdate",
+                title="Date",
+                axis=alt.Axis(
+                    format="%a %e %b",
+                    tickBand='center'
+                )
+            ),
+            alt.Y(
+                "migrants_arrived:Q",
+                title="Migrants Arrived"
+            )
+        )
+    )
+
+
+@instrumented()
+def historical_chart(monthly):
+    """
+    Stacked bar chart of migrants arrived per calendar month, coloured by year.
+
+    Args:
+        monthly: output of chart_data.monthly_totals_by_year
+    Returns:
+        alt.Chart
+    """
+
+    return (
+        alt.Chart(monthly.select('year', 'month', 'migrants_arrived'))
+        .mark_bar()
+        .encode(
+            alt.X("month:O", sort=MONTH_NAMES).title("Date"),
+            alt.Y("migrants_arrived:Q").title("Migrants Arrived"),
+            alt.Color("year:N").title("Year"),
+        )
+        .configure_legend(orient="bottom")
+    )
+
+
+@instrumented()
+def pipeline_runs_chart(spans, value, title):
+    """
+    Line chart of a span measure across pipeline runs, one line per span.
+
+    Args:
+        spans: rows of meta.pipeline_runs with started_at, span and the value column
+        value: column to plot, e.g. wall_seconds
+        title: y axis title
+    Returns:
+        alt.Chart
+    """
+
+    return (
+        alt.Chart(spans.select('started_at', 'span', value))
+        .mark_line(point=True)
+        .encode(
+            alt.X("started_at:T").title("Run started"),
+            alt.Y(f"{value}:Q").title(title),
+            alt.Color("span:N").title("Span"),
+            tooltip=[
+                alt.Tooltip("started_at:T", title="Run started", format="%d %b %Y %H:%M"),
+                alt.Tooltip("span:N", title="Span"),
+                alt.Tooltip(f"{value}:Q", title=title, format=",.2f")
+            ]
+        )
+        .configure_legend(orient="bottom")
+    )
@@ -1,21 +1,7 @@
-import duckdb
 import streamlit as st
-import altair as alt
-from chart_helper import time_series_chart_maker
-from datetime import timedelta, date
-import polars as pl
-
-# establish a connection to the database
-con = duckdb.connect(
-    "migrant_crossings_db.duckdb",
-    read_only=True
-)
-
-# grab some data
-df1 = con.execute('SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_7_days;').pl()
-df2 = con.execute('SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_daily;').pl()
+from datetime import date, timedelta
 
-# dashboard things
+# dashboard things, set before anything else so the page chrome renders straight away
 st.set_page_config(
     # title to show in web browser bar
     page_title="Small boat activity in the English Channel",
@@ -23,6 +9,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# opt-in render profiling, with DASHBOARD_PROFILE=1 or ?profile=1
+from render_profile import RenderProfiler, profiling_enabled
+profiler = RenderProfiler(profiling_enabled(st.query_params))
+profiler.section("introduction")
+
 """
 # Small boat activity in the English Channel
 
@@ -42,87 +33,63 @@ with the aim of gaining entry to the UK without a visa or permission to enter 
 The most common small vessels detected making these types of crossings are rigid-hulled inflatable boats (RHIBs), dinghies and kayaks.
 """
 
-# comparison dates
-latest_preliminary_date = df1['date_ending'].max()
-latest_date = df2['date_ending'].max()
-iso_latest_date = latest_date.isocalendar()
-last_year_same_day_comparison_date = latest_date - timedelta(days=365)
-
-# latest preliminary data
-latest_migrants_arrived = df1['migrants_arrived'][0]
-comparison_migrants_arrived = df2.filter(pl.col('date_ending') == last_year_same_day_comparison_date)['migrants_arrived'][0]
-
-# week summary
-start_of_week = latest_date - timedelta(days=latest_date.weekday())
-end_of_week = start_of_week + timedelta(days=7)
-current_week_total_migrants_arrived = (
-    df2
-    .filter(
-       (pl.col("date_ending") >= start_of_week) &
-       (pl.col("date_ending") <= end_of_week)
-    )
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
-
-# week comparisons
-prev_start_of_week = start_of_week - timedelta(days=7)
-prev_end_of_week = start_of_week
-previous_week_total_migrants_arrived = (
-    df2
-    .filter(
-       (pl.col("date_ending") >= prev_start_of_week) &
-       (pl.col("date_ending") < prev_end_of_week)
-    )
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
+# the introduction above is sent before duckdb and polars are loaded
+profiler.section("load data access")
+from bundle import bundle_dir_from_env, load_bundle
 
-# month summary
-latest_month_start = date(latest_date.year, latest_date.month, 1)
-if latest_date.month == 12:
-    next_month_start = date(latest_date.year + 1, 1, 1)
+# with DASHBOARD_BUNDLE=<dir> every figure comes from the bundle published by
+# execute_all, read once per process, and duckdb is never loaded
+bundle = None
+if bundle_dir_from_env() is not None:
+    bundle = load_bundle(bundle_dir_from_env())
 else:
-    next_month_start = date(latest_date.year, latest_date.month + 1, 1)
+    from data_access import query
+    from kpi_summary import compute_kpi_summary, read_kpi_summary
 
-current_month_total_migrants_arrived = (
-    df2
-    .filter(
-       (pl.col("date_ending") >= latest_month_start) &
-       (pl.col("date_ending") < next_month_start)
+profiler.section("headline metrics")
+if bundle is not None:
+    kpi = bundle.kpi
+else:
+    # headline metrics (precomputed at ingest time)
+    kpi = read_kpi_summary()
+if kpi is None:
+    # nothing below can be drawn until both the daily and 7-day figures exist,
+    # and there is no history to rewind either
+    st.info("No data yet, the figures appear once the daily and 7-day data have been ingested.")
+    profiler.finish(st)
+    st.stop()
+
+# optionally rewind every figure below to how it was published on an earlier day
+as_of = None
+if bundle is None and st.toggle("View a past snapshot", help="Show the figures exactly as they were published on an earlier day"):
+    from point_in_time import history_index, snapshot_as_of
+
+    # the first day both the daily and 7-day figures had been published
+    first_published = max(
+        history_index(table_name).df['begin_date'].min()
+        for table_name in ('raw.migrants_arrived_daily', 'raw.migrants_arrived_7_days')
     )
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
-
-# month comparison
-prev_month_end = latest_month_start - timedelta(days=1)
-prev_month_start = date(prev_month_end.year, prev_month_end.month, 1)
-previous_month_total_migrants_arrived = (
-    df2
-    .filter(
-        (pl.col('date_ending') >= prev_month_start) &
-        (pl.col('date_ending') <= prev_month_end)
+    as_of = st.date_input(
+        "As published on",
+        value=date.today(),
+        min_value=first_published,
+        max_value=date.today(),
+        format="DD/MM/YYYY"
     )
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
-
-# year summary
-current_year_total_migrants_arrived = (
-    df2
-    .filter(pl.col('date_ending').dt.year() == latest_date.year)
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
-
-# year comparison
-previous_year_total_migrants_arrived = (
-    df2
-    .filter(pl.col('date_ending').dt.year() == (latest_date.year - 1))
-    .select(pl.col('migrants_arrived').sum())
-    .item()
-)
+    daily_snapshot = snapshot_as_of('raw.migrants_arrived_daily', as_of)
+    seven_day_snapshot = snapshot_as_of('raw.migrants_arrived_7_days', as_of)
+    st.warning(f"Showing the figures as they were published on {as_of:%d %B %Y}")
+    kpi = compute_kpi_summary(daily_snapshot, seven_day_snapshot)
+latest_preliminary_date = kpi['latest_preliminary_date']
+latest_date = kpi['latest_date']
+latest_migrants_arrived = kpi['latest_migrants_arrived']
+comparison_migrants_arrived = kpi['comparison_migrants_arrived']
+current_week_total_migrants_arrived = kpi['current_week_total_migrants_arrived']
+previous_week_total_migrants_arrived = kpi['previous_week_total_migrants_arrived']
+current_month_total_migrants_arrived = kpi['current_month_total_migrants_arrived']
+previous_month_total_migrants_arrived = kpi['previous_month_total_migrants_arrived']
+current_year_total_migrants_arrived = kpi['current_year_total_migrants_arrived']
+previous_year_total_migrants_arrived = kpi['previous_year_total_migrants_arrived']
 
 f"""
 ## Summary as of {latest_date:%d %B %Y}
@@ -176,6 +143,30 @@ with st.container(horizontal=True, gap="medium"):
 ### Migrants arrived on small boats: last 7 days
 """
 
+# charting is only needed from here on, so the metrics render before altair loads
+profiler.section("load charting")
+from chart_data import monthly_totals_by_year
+from chart_helper import historical_chart, seven_day_chart, time_series_chart_maker
+
+profiler.section("last 7 days")
+if bundle is not None:
+    df1 = bundle.seven_day.select('date_ending', 'migrants_arrived', 'boats_arrived')
+    df2 = bundle.daily.select('date_ending', 'migrants_arrived', 'boats_arrived')
+elif as_of is None:
+    # grab some data (cached per process until the database file changes)
+    df1 = query('SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_7_days;')
+    df2 = query(
+        'SELECT date_ending, migrants_arrived, boats_arrived FROM latest.migrants_arrived_daily ORDER BY date_ending DESC;'
+    ).set_sorted('date_ending', descending=True)
+else:
+    # snapshots come back oldest first, the latest tables are newest first
+    df1 = seven_day_snapshot.select('date_ending', 'migrants_arrived', 'boats_arrived').tail(7).reverse()
+    df2 = (
+        daily_snapshot.select('date_ending', 'migrants_arrived', 'boats_arrived')
+        .reverse()
+        .set_sorted('date_ending', descending=True)
+    )
+
 st.info("""
 Statistical data for the below table is updated daily and more up to date than the weekly statistical
 returns but is subject to change
@@ -184,28 +175,9 @@ tab1, tab2 = st.tabs(["Graph", "Data"])
 with tab1:
     cols = st.columns(1)
     with cols[0].container(border=True, height="stretch"):
-        st.altair_chart(
-            alt.Chart(df1)
-            .mark_bar()
-            .encode(
-                alt.X(
-                    "date_ending:N",
-                    timeUnit="yearmonthdate",
-                    title="Date",
-                    axis=alt.Axis(
-                        format="%a %e %b",
-                        tickBand='center'
-                    )
-                ),
-                alt.Y(
-                    "migrants_arrived:Q",
-                    aggregate="sum",
-                    title="Migrants Arrived"
-                )
-            )
-        )
+        st.altair_chart(profiler.payload(seven_day_chart(df1)))
 with tab2:
-    st.dataframe(df1)
+    st.dataframe(profiler.payload(df1))
 
 seven_days_source_text = """
 Source: 
@@ -217,6 +189,7 @@ Source:
 """
 st.html(seven_days_source_text)
 
+profiler.section("time series")
 """
 ## Time-series data
 """
@@ -238,36 +211,51 @@ Source:
 tab1, tab2, tab3 = st.tabs(["Last 30 days", "Last 90 days", "Last 6 months"])
 with tab1:
     "### Migrants arrived on small boats: last 30 days"
-    seven_days_chart = time_series_chart_maker(data=df2, time_series=7, tickCount=7)
-    st.altair_chart(seven_days_chart, use_container_width=True)
+    thirty_days_chart = time_series_chart_maker(data=df2, window=timedelta(days=30), tickCount=15)
+    st.altair_chart(profiler.payload(thirty_days_chart), use_container_width=True)
 with tab2:
     "### Migrants arrived on small boats: last 90 days"
-    thirty_days_chart = time_series_chart_maker(data=df2, time_series=30, tickCount=15)
-    st.altair_chart(thirty_days_chart, use_container_width=True)
+    ninety_days_chart = time_series_chart_maker(data=df2, window=timedelta(days=90), tickCount=15)
+    st.altair_chart(profiler.payload(ninety_days_chart), use_container_width=True)
 with tab3:
     "### Migrants arrived on small boats: last 6 months"
-    months_chart = time_series_chart_maker(data=df2, time_series=180, tickCount=15)
-    st.altair_chart(months_chart, use_container_width=True)
+    months_chart = time_series_chart_maker(data=df2, window=timedelta(days=180), tickCount=15)
+    st.altair_chart(profiler.payload(months_chart), use_container_width=True)
 
 st.html(daily_source_text)
 
+profiler.section("revisions")
+"""
+### Figures revised this week
+"""
+if bundle is not None:
+    revised = bundle.recent_revisions(date.today())
+else:
+    from revisions import read_recent_revisions
+    revised = read_recent_revisions('raw.migrants_arrived_daily', as_of or date.today())
+if revised.is_empty():
+    st.write("No published daily figures were revised in the last 7 days.")
+else:
+    st.dataframe(profiler.payload(revised))
+
+profiler.section("historical data")
 """
 ## Historical data
 """
 tab1, tab2 = st.tabs(["Graph", "Data"])
 with tab1:
-    st.altair_chart(
-            alt.Chart(df2[['date_ending', 'migrants_arrived']])
-            .mark_bar()
-            .encode(
-                alt.X("date_ending:N", timeUnit="month").title("Date"),
-                alt.Y("migrants_arrived:Q").aggregate("sum").title("Migrants Arrived"),
-                alt.Color("date_ending:N", timeUnit="year").title("Year"),
-            )
-            .configure_legend(orient="bottom")
-        )
+    monthly = bundle.monthly_totals if bundle is not None else monthly_totals_by_year(df2)
+    st.altair_chart(profiler.payload(historical_chart(monthly)))
 with tab2:
-    st.dataframe(df2)
+    # only one page of the full history is sent to the browser
+    from data_browser import FrameSource, TableSource, data_browser
+    if bundle is None and as_of is None:
+        source = TableSource(
+            'latest.migrants_arrived_daily', ['date_ending', 'migrants_arrived', 'boats_arrived'], 'date_ending'
+        )
+    else:
+        source = FrameSource(df2, 'date_ending')
+    profiler.payload(data_browser(source, key='daily', file_name='migrants_arrived_daily'))
 
 st.html(daily_source_text)
 
@@ -275,4 +263,4 @@ st.html(daily_source_text)
 Made with :heart: by adam-dot-py
 """
 
-con.close()
\ No newline at end of file
+profiler.finish(st)
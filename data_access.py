@@ -0,0 +1,138 @@
+import os
+import threading
+import duckdb
+
+DB_PATH = 'migrant_crossings_db.duckdb'
+
+# process-wide state shared by every streamlit session
+_lock = threading.Lock()
+_connection = None
+_connection_version = None
+_cache = {}
+
+
+def database_version(db_path=DB_PATH):
+    """
+    Returns a cheap fingerprint of the database file that changes whenever the
+    ingest scripts publish a new copy of it over the old one.
+
+    Args:
+        db_path: path to the duckdb database file
+    Returns:
+        tuple of (inode, mtime in nanoseconds, size in bytes)
+    """
+
+    stat = os.stat(db_path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _get_connection(version, db_path=DB_PATH):
+    """
+    Returns the shared read-only connection, reopening it when the database
+    file has changed since it was opened. Ingest swaps a new file into place
+    rather than writing to this one, so the open connection keeps reading the
+    old file until then and never waits on a writer. Must be called with the
+    lock held.
+
+    Args:
+        version: the current fingerprint of the database file
+        db_path: path to the duckdb database file
+    Returns:
+        duckdb.DuckDBPyConnection
+    """
+
+    global _connection, _connection_version
+
+    if _connection is None or _connection_version != (db_path, version):
+        if _connection is not None:
+            _connection.close()
+        _connection = duckdb.connect(db_path, read_only=True)
+        _connection_version = (db_path, version)
+
+    return _connection
+
+
+def query(sql, params=None, db_path=DB_PATH, cache=True):
+    """
+    Runs a read-only query against the database and returns the result as a
+    polars dataframe. Results are cached per query and parameters, and the
+    cache is dropped as soon as the database file changes on disk, so every
+    session shares one materialised frame until new data is ingested.
+
+    The returned dataframe is shared between sessions and must not be mutated.
+
+    Args:
+        sql: the query to run
+        params: optional query parameters
+        db_path: path to the duckdb database file
+        cache: whether to cache the result, turn off for queries whose
+            parameters come from user input, e.g. a page of a table, so the
+            cache cannot grow without bound
+    Returns:
+        pl.DataFrame
+    """
+
+    version = database_version(db_path)
+    key = (db_path, sql, tuple(params or ()))
+
+    if not cache:
+        with _lock:
+            return _get_connection(version, db_path).execute(sql, params or []).pl()
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        # a new file version invalidates everything cached from the old one
+        for stale_key in [k for k, (v, _) in _cache.items() if k[0] == db_path and v != version]:
+            del _cache[stale_key]
+
+        con = _get_connection(version, db_path)
+        df = con.execute(sql, params or []).pl()
+        _cache[key] = (version, df)
+
+    return df
+
+
+def copy_to(sql, path, file_format, params=None, db_path=DB_PATH):
+    """
+    Writes the result of a read-only query straight to a file with duckdb's
+    COPY, without materialising it in python.
+
+    Args:
+        sql: the query to run
+        path: file to write
+        file_format: a duckdb COPY format, e.g. csv or parquet
+        params: optional query parameters
+        db_path: path to the duckdb database file
+    Returns:
+        None
+    """
+
+    version = database_version(db_path)
+    quoted_path = str(path).replace("'", "''")
+    with _lock:
+        _get_connection(version, db_path).execute(
+            f"COPY ({sql}) TO '{quoted_path}' (FORMAT {file_format})", params or []
+        )
+
+
+def clear_cache():
+    """
+    Drops every cached result and closes the shared connection.
+
+    Args:
+        None
+    Returns:
+        None
+    """
+
+    global _connection, _connection_version
+
+    with _lock:
+        _cache.clear()
+        if _connection is not None:
+            _connection.close()
+        _connection = None
+        _connection_version = None
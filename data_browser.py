@@ -0,0 +1,208 @@
+import io
+import math
+import tempfile
+from pathlib import Path
+import polars as pl
+import streamlit as st
+
+PAGE_SIZES = [25, 50, 100, 250]
+# label to (duckdb COPY format, file extension, mime type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'csv', 'text/csv'),
+    'Parquet': ('parquet', 'parquet', 'application/vnd.apache.parquet'),
+}
+
+
+class TableSource:
+    """
+    A table in the database browsed a page at a time. Filtering, sorting and
+    paging all happen in duckdb, so only the rows of one page are materialised.
+    Pages are not cached, their parameters come from the user.
+    """
+
+    def __init__(self, table_name, columns, date_column, db_path=None):
+        self.table_name = table_name
+        self.columns = columns
+        self.date_column = date_column
+        self.db_path = db_path
+
+    def _data_access(self):
+        # imported here, so browsing a FrameSource never loads duckdb
+        import data_access
+        return data_access, self.db_path or data_access.DB_PATH
+
+    def _select(self, sort_column, descending, since, until):
+        if sort_column not in self.columns:
+            raise ValueError(f"Cannot sort {self.table_name} by {sort_column}")
+        direction = 'DESC' if descending else 'ASC'
+        # the date breaks ties, so rows never move between pages
+        return f"""
+        SELECT {', '.join(self.columns)}
+        FROM {self.table_name}
+        WHERE {self.date_column} BETWEEN ? AND ?
+        ORDER BY {sort_column} {direction} NULLS LAST, {self.date_column} DESC
+        """, [since, until]
+
+    def date_range(self):
+        """
+        Returns the first and last date in the table.
+
+        Returns:
+            tuple of (date, date)
+        """
+
+        data_access, db_path = self._data_access()
+        return data_access.query(
+            f"SELECT min({self.date_column}), max({self.date_column}) FROM {self.table_name}",
+            db_path=db_path
+        ).row(0)
+
+    def count(self, since, until):
+        """
+        Counts the rows with a date in [since, until].
+
+        Args:
+            since: first date to include
+            until: last date to include
+        Returns:
+            int
+        """
+
+        data_access, db_path = self._data_access()
+        return data_access.query(
+            f"SELECT count(*) FROM {self.table_name} WHERE {self.date_column} BETWEEN ? AND ?",
+            [since, until], db_path=db_path, cache=False
+        ).item()
+
+    def page(self, sort_column, descending, since, until, offset, limit):
+        """
+        Reads one page of the rows with a date in [since, until].
+
+        Args:
+            sort_column: one of columns
+            descending: sort order
+            since: first date to include
+            until: last date to include
+            offset: rows to skip
+            limit: rows to return
+        Returns:
+            pl.DataFrame
+        """
+
+        data_access, db_path = self._data_access()
+        sql, params = self._select(sort_column, descending, since, until)
+        return data_access.query(f"{sql} LIMIT ? OFFSET ?", params + [limit, offset], db_path=db_path, cache=False)
+
+    def export(self, file_format, sort_column, descending, since, until):
+        """
+        Writes every row with a date in [since, until] with duckdb's COPY and
+        returns the file.
+
+        Args:
+            file_format: a duckdb COPY format, e.g. csv or parquet
+            sort_column: one of columns
+            descending: sort order
+            since: first date to include
+            until: last date to include
+        Returns:
+            bytes
+        """
+
+        data_access, db_path = self._data_access()
+        sql, params = self._select(sort_column, descending, since, until)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"export.{file_format}"
+            data_access.copy_to(sql, path, file_format, params, db_path=db_path)
+            return path.read_bytes()
+
+
+class FrameSource:
+    """
+    An in-memory dataframe browsed a page at a time, e.g. a point-in-time
+    snapshot, with the same interface as TableSource.
+    """
+
+    def __init__(self, df, date_column):
+        self.df = df
+        self.columns = df.columns
+        self.date_column = date_column
+
+    def _select(self, sort_column, descending, since, until):
+        if sort_column not in self.columns:
+            raise ValueError(f"Cannot sort by {sort_column}")
+        return (
+            self.df.filter(pl.col(self.date_column).is_between(since, until))
+            .sort([sort_column, self.date_column], descending=[descending, True], nulls_last=True)
+        )
+
+    def date_range(self):
+        return self.df[self.date_column].min(), self.df[self.date_column].max()
+
+    def count(self, since, until):
+        return self.df.filter(pl.col(self.date_column).is_between(since, until)).height
+
+    def page(self, sort_column, descending, since, until, offset, limit):
+        return self._select(sort_column, descending, since, until).slice(offset, limit)
+
+    def export(self, file_format, sort_column, descending, since, until):
+        buffer = io.BytesIO()
+        df = self._select(sort_column, descending, since, until)
+        if file_format == 'csv':
+            df.write_csv(buffer)
+        else:
+            df.write_parquet(buffer)
+        return buffer.getvalue()
+
+
+def data_browser(source, key, file_name):
+    """
+    Renders a paged view of a TableSource or FrameSource with a date filter,
+    sorting and CSV / Parquet export. Only the current page is sent to the
+    browser, and exports are only produced when their button is clicked.
+
+    Args:
+        source: TableSource or FrameSource
+        key: unique prefix for the widget keys
+        file_name: export file name without extension
+    Returns:
+        pl.DataFrame, the page that was shown
+    """
+
+    first, last = source.date_range()
+    with st.container(horizontal=True, gap="medium", vertical_alignment="bottom"):
+        dates = st.date_input(
+            "Dates",
+            value=(first, last),
+            min_value=first,
+            max_value=last,
+            format="DD/MM/YYYY",
+            key=f"{key}_dates"
+        )
+        sort_column = st.selectbox("Sort by", source.columns, key=f"{key}_sort")
+        descending = st.toggle("Newest / largest first", value=True, key=f"{key}_descending")
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    # the range is a single date while the second end is being picked
+    since, until = (dates[0], dates[-1]) if dates else (first, last)
+    rows = source.count(since, until)
+    pages = max(1, math.ceil(rows / page_size))
+    # the label changes with the number of pages, which sends the reader back to page 1
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+
+    offset = (page - 1) * page_size
+    df = source.page(sort_column, descending, since, until, offset, page_size)
+    st.dataframe(df, hide_index=True)
+    st.caption(f"Rows {min(offset + 1, rows):,} to {offset + df.height:,} of {rows:,}")
+
+    with st.container(horizontal=True, gap="small"):
+        for label, (file_format, extension, mime) in EXPORT_FORMATS.items():
+            st.download_button(
+                f"Download {label}",
+                data=lambda file_format=file_format: source.export(file_format, sort_column, descending, since, until),
+                file_name=f"{file_name}_{since:%Y%m%d}_{until:%Y%m%d}.{extension}",
+                mime=mime,
+                key=f"{key}_download_{extension}",
+                on_click='ignore'
+            )
+
+    return df
@@ -1,37 +1,181 @@
+import logging
+import os
 import shutil
-import time
 from pathlib import Path
-from ingest_7_day_data import extract_seven_day_data
-from ingest_daily_data import extract_daily_data
-from ingest_weekly_data import extract_weekly_data
-from extract_data import fetch_migrant_data
+from instrumentation import (
+    log_run_summary, pipeline_run, record_pipeline_run, runs_spool_path, span, spool_pipeline_run
+)
+from pipeline import Stage, raise_for_failures, run_stages
+from publish import NothingToPublish, ingest_lock, staged_database
+
+DB_PATH = 'migrant_crossings_db.duckdb'
+
+
+def _in_transaction(con, extract, **kwargs):
+    # each ingest stage gets its own cursor and transaction, so stages can run
+    # side by side and a retried stage starts again from a clean slate. The run
+    # is no longer one transaction on purpose: a stage that commits is only
+    # published with the staging copy, so atomicity comes from staged_database
+    cursor = con.cursor()
+    try:
+        cursor.execute("BEGIN TRANSACTION")
+        result = extract(cursor, **kwargs)
+        cursor.execute("COMMIT")
+        return result
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+
+
+def archive_incoming(incoming_files, data_path):
+    """
+    Moves ingested releases from incoming/ into the data/ archive.
+
+    Args:
+        incoming_files: release paths to move
+        data_path: archive directory
+    Returns:
+        list of archived paths
+    Raises:
+        RuntimeError: listing every file that could not be moved
+    """
+
+    archived = []
+    problems = []
+    for f in incoming_files:
+        try:
+            archived.append(Path(shutil.move(f, Path(data_path) / f.name)))
+            logging.info(f"Archived -> {archived[-1]}")
+        except OSError as e:
+            problems.append(f"{f.name} -> {e}")
+
+    if problems:
+        raise RuntimeError("Could not archive:\n" + "\n".join(problems))
+    return archived
+
 
 def execute_all():
 
+    # setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
     p = Path()
     incoming_path = p / 'incoming'
     data_path = p / 'data'
+    # runs that publish nothing are kept here until one does
+    spool_path = runs_spool_path(DB_PATH)
 
-    # extract file
-    fetch_migrant_data()
-    time.sleep(5)
+    # one run at a time, an overlapping run fails here before fetching anything
+    with ingest_lock(DB_PATH), pipeline_run(execute_all.__name__) as run:
+        # stages import their dependencies when they run, so a run that finds
+        # nothing new never loads polars or the ingest modules
+        from extract_data import fetch_migrant_data
+        from fetch_cache import load_fetch_cache, save_fetch_cache
 
-    # ingest data
-    extract_seven_day_data()
-    extract_daily_data()
-    extract_weekly_data()
+        # extract file and the 7-day page, returns once both are complete
+        with span('fetch'):
+            fetched = fetch_migrant_data(cache=load_fetch_cache(DB_PATH))
+        incoming_files = sorted(incoming_path.glob('*.ods'))
+        if fetched.ods_failed:
+            # whatever else was fetched is still ingested, but the run is a failure
+            run.root.status, run.root.error = 'failed', "The time series release could not be downloaded"
+        # a failed 7-day fetch is retried by its ingest stage, which fetches the page itself
+        if not fetched.seven_day_changed and not fetched.seven_day_failed and not incoming_files:
+            spool_pipeline_run(run, spool_path)
+            log_run_summary(run)
+            if fetched.ods_failed:
+                raise RuntimeError(run.root.error)
+            logging.info("Nothing has changed since the last run")
+            return
 
-    # move incoming file
-    source_dir = None
-    target_dir = None
-    for f in incoming_path.glob('*.ods'):
-        source_dir = incoming_path / f.name
-        target_dir = data_path / f.name
+        from bundle import publish_bundle, write_bundle
+        from ingest_7_day_data import extract_seven_day_data
+        from ingest_daily_data import extract_daily_data
+        from ingest_manifest import ensure_meta_tables
+        from ingest_weekly_data import extract_weekly_data
+        from kpi_summary import refresh_kpi_summary
+        from latest_tables import refresh_latest_tables
+        from point_in_time import ensure_as_of_macros
+        from release_loader import read_release_sheets
+        from schema_check import check_ingest_schemas
 
-    try:
-      shutil.move(source_dir, target_dir)
-    except Exception as e:
-        pass
+        # ingest into a staging copy, published all or nothing, so dashboard
+        # readers never see a half written file
+        try:
+            with staged_database(DB_PATH) as con:
+
+                def seven_day(check_schemas, meta_tables):
+                    if not fetched.seven_day_changed and not fetched.seven_day_failed:
+                        logging.info("Skipping extract_seven_day_data, page unchanged")
+                        return None
+                    return _in_transaction(con, extract_seven_day_data, html=fetched.seven_day_html)
+
+                def read_releases():
+                    # parse each release once, the daily and weekly stages share the cache
+                    for f in incoming_files:
+                        read_release_sheets(f)
+
+                def daily(check_schemas, meta_tables, read_releases):
+                    return _in_transaction(con, extract_daily_data)
+
+                def weekly(check_schemas, meta_tables, read_releases):
+                    return _in_transaction(con, extract_weekly_data)
+
+                def refresh(seven_day, daily, weekly):
+                    # refresh the read path, only where the raw data actually changed
+                    changed = {r.table_name for r in (seven_day, daily, weekly) if r is not None and r.changed}
+                    if refresh_latest_tables(con, changed):
+                        refresh_kpi_summary(con)
+                    ensure_as_of_macros(con)
+                    # remember what was fetched only once it has been merged
+                    save_fetch_cache(con, fetched.cache_entries)
+                    return changed
+
+                # stages commit separately, a failed run still publishes nothing
+                # because the staging copy is discarded, see _in_transaction
+                results = run_stages([
+                    # no ingest starts if the DDL and ingest code disagree
+                    Stage('check_schemas', check_ingest_schemas),
+                    Stage('meta_tables', lambda: ensure_meta_tables(con)),
+                    Stage('read_releases', read_releases),
+                    Stage('seven_day', seven_day, ('check_schemas', 'meta_tables'), retries=2),
+                    Stage('daily', daily, ('check_schemas', 'meta_tables', 'read_releases'), retries=2),
+                    Stage('weekly', weekly, ('check_schemas', 'meta_tables', 'read_releases'), retries=2),
+                    Stage('refresh', refresh, ('seven_day', 'daily', 'weekly')),
+                    # the dashboard's figures as a static bundle, published with the database
+                    Stage('export_bundle', lambda refresh: write_bundle(con) if refresh else None, ('refresh',)),
+                ])
+                raise_for_failures(results)
+                changed = results['refresh'].value
+                if not changed:
+                    # republishing an unchanged file would only invalidate the dashboard's caches
+                    logging.info("No raw table changed, nothing to publish")
+                    raise NothingToPublish
+                # timings are published with the data, together with the spooled
+                # runs that published nothing. Failed runs are only logged
+                record_pipeline_run(con, run, spool_path)
+        except Exception as e:
+            logging.critical(f"Ingest rolled back -> {e}")
+            log_run_summary(run)
+            raise
+
+        if changed:
+            publish_bundle(results['export_bundle'].value)
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+        else:
+            spool_pipeline_run(run, spool_path)
+
+        # only archive releases once they are in the published database
+        archive_incoming(incoming_files, data_path)
+        log_run_summary(run)
+        if fetched.ods_failed:
+            raise RuntimeError(run.root.error)
 
 if __name__ == "__main__":
-    execute_all()
\ No newline at end of file
+    execute_all()
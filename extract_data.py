@@ -1,6 +1,14 @@
+import asyncio
+import hashlib
 import logging
+import os
 import requests
-from playwright.sync_api import sync_playwright
+from fetch_cache import CacheEntry, conditional_headers
+from html.parser import HTMLParser
+from instrumentation import span
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import urljoin
 
 # setup logging
 logging.basicConfig(
@@ -8,40 +16,214 @@ logging.basicConfig(
   format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+PUBLICATION_URL = "https://www.gov.uk/government/publications/migrants-detected-crossing-the-english-channel-in-small-boats"
+SEVEN_DAY_URL = "https://www.gov.uk/government/publications/migrants-detected-crossing-the-english-channel-in-small-boats/migrants-detected-crossing-the-english-channel-in-small-boats-last-7-days"
+DOWNLOAD_TEXT = "Migrants detected crossing the English Channel in small boats – time series"
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = 60
+
+
+class FetchResult(NamedTuple):
+    ods_path: Optional[Path]
+    seven_day_html: Optional[str]
+    ods_changed: bool
+    seven_day_changed: bool
+    cache_entries: list
+    ods_failed: bool = False
+    seven_day_failed: bool = False
+
+
+class _LinkFinder(HTMLParser):
+    """
+    Finds the href of the first <a> whose text contains the given text, ignoring
+    case and runs of whitespace.
+    """
+
+    def __init__(self, text):
+        super().__init__()
+        self.text = " ".join(text.split()).lower()
+        self.href = None
+        self._current_href = None
+        self._current_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a' and self.href is None:
+            self._current_href = dict(attrs).get('href')
+            self._current_text = []
+
+    def handle_data(self, data):
+        if self._current_href is not None:
+            self._current_text.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'a' and self._current_href is not None:
+            if self.text in " ".join("".join(self._current_text).split()).lower():
+                self.href = self._current_href
+            self._current_href = None
+
+
+def find_link(html, text, base_url):
+    """
+    Returns the absolute url of the first link whose text contains `text`.
+
+    Args:
+        html: page html
+        text: link text to look for
+        base_url: url the page was served from
+    Returns:
+        str, or None when there is no such link
+    """
+
+    finder = _LinkFinder(text)
+    finder.feed(html)
+    finder.close()
+    return urljoin(base_url, finder.href) if finder.href else None
+
+
+def _cache_entry(response, url, content_hash):
+    return CacheEntry(
+        url=url,
+        etag=response.headers.get('etag'),
+        last_modified=response.headers.get('last-modified'),
+        content_hash=content_hash
+    )
+
+
+def _get_text(session, url, cached=None, label='page'):
+    # returns (text, cache entry, changed), text is None when unchanged
+    with span(f"fetch {label}") as s:
+        response = session.get(url, headers=conditional_headers(cached), timeout=TIMEOUT)
+        s.add(bytes_downloaded=len(response.content))
+        if response.status_code == 304:
+            return None, None, False
+        response.raise_for_status()
+
+    entry = _cache_entry(response, url, hashlib.sha256(response.content).hexdigest())
+    if cached is not None and cached.content_hash == entry.content_hash:
+        return None, entry, False
+
+    # without a declared charset requests assumes latin-1, which mangles the en dash
+    if 'charset' not in response.headers.get('content-type', ''):
+        response.encoding = response.apparent_encoding
+    return response.text, entry, True
+
+
+def _download(session, url, output_path, cached=None):
+    # stream to a partial file and rename it once complete and known to be new
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = output_path.with_name(output_path.name + '.part')
+    digest = hashlib.sha256()
+    with span("fetch time_series") as s, \
+            session.get(url, headers=conditional_headers(cached), stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 304:
+            return None, None, False
+        response.raise_for_status()
+        with open(partial_path, 'wb') as fp:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                digest.update(chunk)
+                fp.write(chunk)
+                s.add(bytes_downloaded=len(chunk))
+
+    entry = _cache_entry(response, url, digest.hexdigest())
+    if cached is not None and cached.content_hash == entry.content_hash:
+        os.remove(partial_path)
+        return None, entry, False
+
+    os.replace(partial_path, output_path)
+    return output_path, entry, True
+
+
+async def _fetch_time_series(session, url, text, incoming_path, cache):
+    page, _, _ = await asyncio.to_thread(_get_text, session, url, label='publication_page')
+    href = find_link(page, text, url)
+    if href is None:
+        raise ValueError(f"No link matching '{text}' on {url}")
+
+    download_file_name = href.split("/")[-1]
+    output_path, entry, changed = await asyncio.to_thread(
+        _download, session, href, incoming_path / download_file_name, cache.get(href)
+    )
+    if changed:
+        logging.info(f"Downloaded -> {download_file_name}")
+    else:
+        logging.info(f"Unchanged -> {download_file_name}")
+    return output_path, entry, changed
+
+
+async def fetch_migrant_data_async(
+        url=PUBLICATION_URL,
+        seven_day_url=SEVEN_DAY_URL,
+        incoming_path=Path('incoming'),
+        cache=None
+):
+    """
+    Fetches the latest time series .ods and the 7-day page concurrently. The
+    .ods link is resolved from the publication page and the file is streamed to
+    disk in chunks; it only appears under its final name once fully written.
+
+    Both sources are requested conditionally using the ETag / Last-Modified
+    validators in `cache`. A source counts as unchanged when the server answers
+    304 or the body hashes to the cached content hash, in which case nothing is
+    written and its payload is None.
+
+    A failure in one source is logged and does not stop the other. Failed
+    sources are reported as failed, not changed, with a None payload.
+
+    Args:
+        url: publication page linking to the time series .ods
+        seven_day_url: page holding the last 7 days table
+        incoming_path: directory to download the .ods into
+        cache: optional dict of url to CacheEntry from fetch_cache.load_fetch_cache
+    Returns:
+        FetchResult, whose cache_entries should be saved once the fetched data
+        has been merged
+    """
+
+    cache = cache or {}
+    with requests.Session() as session:
+        ods, seven_day = await asyncio.gather(
+            _fetch_time_series(session, url, DOWNLOAD_TEXT, Path(incoming_path), cache),
+            asyncio.to_thread(_get_text, session, seven_day_url, cache.get(seven_day_url), 'seven_day_page'),
+            return_exceptions=True
+        )
+
+    ods_failed = isinstance(ods, Exception)
+    if ods_failed:
+        logging.critical(f"An Exception occured fetching the time series: {ods}")
+        ods = (None, None, False)
+    seven_day_failed = isinstance(seven_day, Exception)
+    if seven_day_failed:
+        logging.critical(f"An Exception occured fetching the 7-day page: {seven_day}")
+        seven_day = (None, None, False)
+
+    ods_path, ods_entry, ods_changed = ods
+    seven_day_html, seven_day_entry, seven_day_changed = seven_day
+    if not seven_day_changed and not seven_day_failed:
+        logging.info("Unchanged -> 7-day page")
+
+    return FetchResult(
+        ods_path=ods_path,
+        seven_day_html=seven_day_html,
+        ods_changed=ods_changed,
+        seven_day_changed=seven_day_changed,
+        cache_entries=[e for e in (ods_entry, seven_day_entry) if e is not None],
+        ods_failed=ods_failed,
+        seven_day_failed=seven_day_failed
+    )
+
+
 # function to fetch data
-def fetch_migrant_data():
-    """
-    _docstring
-    :return:
-    """
-
-    url = "https://www.gov.uk/government/publications/migrants-detected-crossing-the-english-channel-in-small-boats"
-    download_text = "Migrants detected crossing the English Channel in small boats – time series"
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url)
-
-            href = page.locator(
-                "a",
-                has_text=download_text
-            ).first.get_attribute("href")
-
-            try:
-              download_resp = requests.get(href)
-              download_resp.raise_for_status()
-              download_file_name = href.split("/")[-1]
-              output_dir = f"incoming/{download_file_name}"
-              with open(output_dir, 'wb') as fp:
-                  fp.write(download_resp.content)
-              logging.info(f"Downloaded -> {download_file_name}")
-            except requests.exceptions.RequestException as e:
-                logging.critical(f"An RequestException error occured: {e}")
-                raise
-    except Exception as e:
-        logging.critical(f"An Exception occured: {e}")
+def fetch_migrant_data(**kwargs):
+    """
+    Runs fetch_migrant_data_async to completion.
+
+    Args:
+        **kwargs: passed through to fetch_migrant_data_async
+    Returns:
+        FetchResult
+    """
+
+    return asyncio.run(fetch_migrant_data_async(**kwargs))
 
 if __name__ == "__main__":
-    fetch_migrant_data()
\ No newline at end of file
+    fetch_migrant_data()
@@ -0,0 +1,81 @@
+import logging
+import os
+from datetime import datetime
+from typing import NamedTuple, Optional
+from ingest_manifest import ensure_meta_tables
+
+CACHE_TABLE = "meta.http_cache"
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: str
+
+
+def conditional_headers(entry):
+    """
+    Builds the request headers that let the server answer 304 Not Modified.
+
+    Args:
+        entry: CacheEntry for the url, or None
+    Returns:
+        dict of headers
+    """
+
+    headers = {}
+    if entry is not None and entry.etag:
+        headers['If-None-Match'] = entry.etag
+    if entry is not None and entry.last_modified:
+        headers['If-Modified-Since'] = entry.last_modified
+    return headers
+
+
+def load_fetch_cache(db_path='migrant_crossings_db.duckdb'):
+    """
+    Reads the validators and content hashes stored by previous runs.
+
+    Args:
+        db_path: path to the duckdb database file
+    Returns:
+        dict of url to CacheEntry, empty when nothing has been cached yet
+    """
+
+    if not os.path.exists(db_path):
+        return {}
+
+    # imported here so that importing CacheEntry for the fetch stage stays cheap
+    import duckdb
+
+    con = duckdb.connect(db_path, read_only=True)
+    try:
+        rows = con.execute(f"SELECT url, etag, last_modified, content_hash FROM {CACHE_TABLE}").fetchall()
+    except duckdb.CatalogException:
+        rows = []
+    finally:
+        con.close()
+
+    return {row[0]: CacheEntry(*row) for row in rows}
+
+
+def save_fetch_cache(con, entries):
+    """
+    Stores new validators and content hashes. Call this inside the ingest
+    transaction, so a source is only remembered once its data has been merged.
+
+    Args:
+        con: an open read-write duckdb connection
+        entries: iterable of CacheEntry
+    Returns:
+        None
+    """
+
+    ensure_meta_tables(con)
+    for entry in entries:
+        con.execute(f"DELETE FROM {CACHE_TABLE} WHERE url = ?", [entry.url])
+        con.execute(
+            f"INSERT INTO {CACHE_TABLE} VALUES (?, ?, ?, ?, ?)",
+            [entry.url, entry.etag, entry.last_modified, entry.content_hash, datetime.now()]
+        )
+        logging.info(f"Cached validators for {entry.url}")
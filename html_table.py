@@ -0,0 +1,102 @@
+import polars as pl
+from html.parser import HTMLParser
+
+FEED_SIZE = 64 * 1024
+
+
+class _FirstTableParser(HTMLParser):
+    """
+    Collects the header and body cells of the first <table> whose header row
+    contains every expected column, and flags when that table has closed.
+    """
+
+    def __init__(self, expected_columns=()):
+        super().__init__(convert_charrefs=True)
+        self.expected_columns = set(expected_columns)
+        self.header = None
+        self.rows = []
+        self.done = False
+        self._depth = 0
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'table':
+            self._depth += 1
+            if self._depth == 1:
+                self.header, self.rows = None, []
+        elif self._depth == 1 and tag == 'tr':
+            self._row = []
+        elif self._depth == 1 and tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def handle_endtag(self, tag):
+        if self.done or self._depth == 0:
+            return
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            if self.header is None:
+                self.header = self._row
+            elif self._row:
+                self.rows.append(self._row)
+            self._row = None
+        elif tag == 'table':
+            self._depth -= 1
+            if self._depth == 0 and self.header is not None and self.expected_columns <= set(self.header):
+                self.done = True
+
+
+def read_first_table(chunks, schema_overrides=None):
+    """
+    Streams html through an incremental parser and returns the first table whose
+    header contains every column in schema_overrides. Parsing stops as soon as
+    that table closes, so the rest of the page is never read.
+
+    Numeric columns have thousands separators stripped, and cells that cannot be
+    converted (e.g. '-') become null.
+
+    Args:
+        chunks: the page as a str, or an iterable of str chunks
+        schema_overrides: optional dict of column name to polars dtype
+    Returns:
+        pl.DataFrame
+    """
+
+    schema_overrides = schema_overrides or {}
+    if isinstance(chunks, str):
+        html = chunks
+        chunks = (html[i:i + FEED_SIZE] for i in range(0, len(html), FEED_SIZE))
+
+    parser = _FirstTableParser(schema_overrides.keys())
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+
+    if not parser.done:
+        raise ValueError(f"No table with columns {list(schema_overrides)} found")
+
+    width = len(parser.header)
+    df = pl.DataFrame(
+        [row[:width] + [None] * (width - len(row)) for row in parser.rows],
+        schema={column: pl.String() for column in parser.header},
+        orient='row'
+    )
+
+    columns = []
+    for column, dtype in schema_overrides.items():
+        values = pl.col(column).replace('', None)
+        if dtype.is_numeric():
+            values = values.str.replace_all(',', '')
+        columns.append(values.cast(dtype, strict=False).alias(column))
+
+    return df.with_columns(columns)
@@ -1,69 +1,56 @@
 import logging
-import ssl
-import certifi
-import duckdb
 import polars as pl
-import pandas as pd
-from pathlib import Path
+import requests
+from extract_data import SEVEN_DAY_URL, TIMEOUT
+from html_table import FEED_SIZE, read_first_table
+from ingest_manifest import ensure_meta_tables
+from instrumentation import add_to_span
+from publish import run_standalone
 from datetime import datetime
+from revisions import merge_release
 
-def extract_seven_day_data():
+TABLE_NAME = "raw.migrants_arrived_7_days"
+
+SCHEMA_OVERRIDES = {
+    'Date': pl.String(),
+    'Migrants arrived': pl.Int16(),
+    'Boats arrived': pl.Int16(),
+    'Boats involved in uncontrolled landings': pl.Int16(),
+    'Notes': pl.String()
+}
+
+SCHEMA = [
+    'date_ending',
+    'migrants_arrived',
+    'boats_arrived',
+    'boats_arrived_involved_in_uncontrolled_landings',
+    'notes'
+]
+
+KEY_COLUMNS = ['date_ending']
+
+TRACKED_COLUMNS = [
+    'migrants_arrived',
+    'boats_arrived',
+    'boats_arrived_involved_in_uncontrolled_landings',
+    'notes'
+]
+
+
+def prepare_seven_day_data(df, as_of):
     """
-    Extracts the latest snapshot UK Government daily statistical data for the last 7 days
-    relating to migrant crossings.
+    Converts the 7-day table scraped from gov.uk into the raw table layout with
+    scd flags.
 
     Args:
-        None
+        df: the scraped table with its original column names
+        as_of: the date the new versions become effective
     Returns:
-        None
+        pl.DataFrame
     """
 
-    # setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
-
-    logging.info(f"Running {extract_seven_day_data.__name__}")
-
-    # setup duckdb
-    con = duckdb.connect('migrant_crossings_db.duckdb')
-    table_name = "raw.migrants_arrived_7_days"
-
-    # setup paths
-    p = Path()
-    incoming_path = p / 'incoming'
-    data_path = p / 'data'
-
-    # sort ssl issues
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    ssl._create_default_https_context = lambda: ssl_context
-
-    schema_overrides = {
-        'Date': pl.String(),
-        'Migrants arrived': pl.Int16(),
-        'Boats arrived': pl.Int16(),
-        'Boats involved in uncontrolled landings': pl.Int16(),
-        'Notes': pl.String()
-    }
-
-    schema = [
-        'date_ending',
-        'migrants_arrived',
-        'boats_arrived',
-        'boats_arrived_involved_in_uncontrolled_landings',
-        'notes'
-    ]
-
-    # extract data
-    gov_web_page = "https://www.gov.uk/government/publications/migrants-detected-crossing-the-english-channel-in-small-boats/migrants-detected-crossing-the-english-channel-in-small-boats-last-7-days"
-    df = pl.from_pandas(
-        data=pd.read_html(gov_web_page)[0],
-        schema_overrides=schema_overrides
-    )
-
     # apply the expected table schema for column names
-    df.columns = schema
+    df.columns = SCHEMA
 
     # convert the date
     df = df.with_columns(
@@ -71,67 +58,92 @@ def extract_seven_day_data():
     )
 
     # add sdc flags for upsert and merging
-    current_date = datetime.now().date()
     df = df.with_columns(
-        pl.lit(f"{current_date}-update").alias('source'),
+        pl.lit(f"{as_of}-update").alias('source'),
         pl.lit(True).alias('is_current'),
-        pl.lit(current_date).alias('begin_date').cast(pl.Date()),
+        pl.lit(as_of).alias('begin_date').cast(pl.Date()),
         pl.lit(None).alias('end_date').cast(pl.Date())
     )
 
-    # register the df for ingestion into the database
-    con.register('polarsDF', df)
+    return df
+
+
+def merge_seven_day_data(con, df, as_of):
+    """
+    Merges a prepared 7-day dataframe into the raw table. Current rows that were
+    revised or have dropped out of the 7-day window are expired the day before
+    as_of, and a new current version is inserted for every revised or new date.
+    The diff against the current rows is recorded in meta.revisions first, and
+    the merge is skipped when no key changed.
+
+    Args:
+        con: an open read-write duckdb connection
+        df: dataframe from prepare_seven_day_data
+        as_of: the date the new versions become effective
+    Returns:
+        MergeResult
+    """
+
+    return merge_release(con, TABLE_NAME, df, KEY_COLUMNS, TRACKED_COLUMNS, as_of)
+
+
+def extract_seven_day_data(con=None, html=None):
+    """
+    Extracts the latest snapshot UK Government daily statistical data for the last 7 days
+    relating to migrant crossings.
+
+    Args:
+        con: optional open read-write duckdb connection. When given, the caller
+            owns it and its transaction: it is left open, nothing is refreshed
+            and errors are raised. When omitted, the ingest runs on its own
+            through publish.run_standalone, which publishes a staging copy of
+            the database only if all of it succeeded, logging any error
+        html: optional already fetched 7-day page, fetched here when omitted
+    Returns:
+        MergeResult, or None when the merge failed
+    """
+
+    # setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    # standalone runs publish through a staging copy, see publish.run_standalone
+    if con is None:
+        return run_standalone(extract_seven_day_data.__name__, lambda con: extract_seven_day_data(con, html=html))
+
+    logging.info(f"Running {extract_seven_day_data.__name__}")
+
+    # extract data, streaming the page until the table has been read
+    if html is None:
+        with requests.get(SEVEN_DAY_URL, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            # without a declared charset requests assumes latin-1 for text/html, and
+            # sniffing the encoding would read the whole page before parsing it
+            if 'charset' not in response.headers.get('content-type', ''):
+                response.encoding = 'utf-8'
+            df = read_first_table(
+                response.iter_content(chunk_size=FEED_SIZE, decode_unicode=True),
+                schema_overrides=SCHEMA_OVERRIDES
+            )
+    else:
+        df = read_first_table(html, schema_overrides=SCHEMA_OVERRIDES)
+
+    add_to_span(rows_in=df.height)
+
+    current_date = datetime.now().date()
+    df = prepare_seven_day_data(df, current_date)
+    ensure_meta_tables(con)
 
     # upsert and merge
-    try:
-        logging.info("Attempting merge...")
-        con.sql(f"""
-        MERGE into {table_name} AS target
-        USING polarsDF AS source
-        ON target.date_ending = source.date_ending
-        AND target.is_current = true
-        WHEN MATCHED AND (
-               target.migrants_arrived <> source.migrants_arrived OR
-               target.boats_arrived    <> source.boats_arrived    OR
-               target.boats_arrived_involved_in_uncontrolled_landings  <> source.boats_arrived_involved_in_uncontrolled_landings OR
-               target.notes <> source.notes
-            ) THEN UPDATE SET
-            end_date    = CURRENT_DATE - INTERVAL '1 day',
-            is_current  = false
-        WHEN NOT MATCHED BY SOURCE AND target.is_current = true THEN UPDATE SET
-            end_date    = CURRENT_DATE - INTERVAL '1 day',
-            is_current  = false
-        WHEN NOT MATCHED BY TARGET THEN INSERT (
-            record_id,
-            date_ending,
-            migrants_arrived,
-            boats_arrived,
-            boats_arrived_involved_in_uncontrolled_landings,
-            notes,
-            source,
-            is_current,
-            begin_date,
-            end_date
-        ) VALUES (
-            nextval('duck_record_sequence'),
-            source.date_ending,
-            source.migrants_arrived,
-            source.boats_arrived,
-            source.boats_arrived_involved_in_uncontrolled_landings,
-            source.notes,
-            source.source,
-            source.is_current,
-            source.begin_date,
-            source.end_date
-        )
-        """)
-        logging.info(f"Updated -> {table_name}")
-        con.close()
-        logging.info("Connection to duckdb closed")
-    except Exception as e:
-        logging.critical(f"Something went wrong -> {e}")
-        con.close()
-        logging.info("Connection to duckdb closed")
+    logging.info("Attempting merge...")
+    result = merge_seven_day_data(con, df, current_date)
+    if result.changed:
+        logging.info(f"Updated -> {TABLE_NAME}")
+    add_to_span(rows_out=result.inserted + result.expired)
+
+    return result
 
 if __name__ == "__main__":
-    extract_seven_day_data()
\ No newline at end of file
+    run_standalone(extract_seven_day_data.__name__, extract_seven_day_data)
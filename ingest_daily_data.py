@@ -1,20 +1,105 @@
 import logging
-import duckdb
 import polars as pl
-import shutil
-import time
 from pathlib import Path
 from datetime import datetime
-from extract_data import fetch_migrant_data
+from instrumentation import add_to_span
+from publish import run_standalone
+from ingest_manifest import ensure_meta_tables, is_ingested, record_ingest
+from release_loader import file_fingerprint, read_release_sheets, sort_releases
+from revisions import merge_release
+
+TABLE_NAME = "raw.migrants_arrived_daily"
+SHEET_NAME = 'SB_01'
+
+SCHEMA_OVERRIDES = {
+    'Date': pl.Date(),
+    'Migrants arrived': pl.Int16(),
+    'Boats arrived': pl.Int16(),
+    'Boats arrived - involved in uncontrolled landings': pl.Int16(),
+    'Notes': pl.String()
+}
+
+SCHEMA = [
+    'date_ending',
+    'migrants_arrived',
+    'boats_arrived',
+    'boats_arrived_involved_in_uncontrolled_landings',
+    'notes',
+    'source'
+]
+
+KEY_COLUMNS = ['date_ending']
+
+TRACKED_COLUMNS = [
+    'migrants_arrived',
+    'boats_arrived',
+    'boats_arrived_involved_in_uncontrolled_landings',
+    'notes'
+]
+
+
+def prepare_daily_data(sheets, as_of):
+    """
+    Converts SB_01 sheets into the raw table layout with scd flags.
+
+    Args:
+        sheets: list of SB_01 dataframes, each with a 'source' column appended
+        as_of: the date the new versions become effective
+    Returns:
+        pl.DataFrame
+    """
+
+    # create the polars dataframe
+    df = pl.concat([s.cast(SCHEMA_OVERRIDES, strict=False) for s in sheets])
+
+    # apply the expected table schema for column names
+    df.columns = SCHEMA
+
+    # keep the latest release's figures for each date, then sort descending (latest first)
+    df = df.unique(subset=KEY_COLUMNS, keep='last', maintain_order=True)
+    df = df.sort(by=pl.col('date_ending'), descending=True)
+
+    # add sdc flags for upsert and merging
+    df = df.with_columns(
+        pl.lit(True).alias('is_current'),
+        pl.lit(as_of).alias('begin_date').cast(pl.Date()),
+        pl.lit(None).alias('end_date').cast(pl.Date())
+    )
+
+    return df
+
+
+def merge_daily_data(con, df, as_of):
+    """
+    Merges a prepared daily dataframe into the raw table. Current rows that
+    were revised or dropped are expired the day before as_of, and a new current
+    version is inserted for every revised or new date.
+    The diff against the current rows is recorded in meta.revisions first, and
+    the merge is skipped when no key changed.
 
-def extract_daily_data():
+    Args:
+        con: an open read-write duckdb connection
+        df: dataframe from prepare_daily_data
+        as_of: the date the new versions become effective
+    Returns:
+        MergeResult
+    """
+
+    return merge_release(con, TABLE_NAME, df, KEY_COLUMNS, TRACKED_COLUMNS, as_of)
+
+
+def extract_daily_data(con=None):
     """
-    Extracts the latest UK Government weekly statistical data on migrant crossings
+    Extracts the latest UK Government daily statistical data on migrant crossings
 
     Args:
-        None
+        con: optional open read-write duckdb connection. When given, the caller
+            owns it and its transaction: it is left open, nothing is refreshed
+            and errors are raised. When omitted, the ingest runs on its own
+            through publish.run_standalone, which publishes a staging copy of
+            the database only if all of it succeeded, logging any error
     Returns:
-        None
+        MergeResult, or None when there was nothing to merge or the merge failed
     """
 
     # setup logging
@@ -23,115 +108,52 @@ def extract_daily_data():
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
 
-    logging.info(f"Running {extract_daily_data.__name__}")
+    # standalone runs publish through a staging copy, see publish.run_standalone
+    if con is None:
+        return run_standalone(extract_daily_data.__name__, extract_daily_data)
 
-    # setup duckdb
-    con = duckdb.connect('migrant_crossings_db.duckdb')
-    table_name = "raw.migrants_arrived_daily"
+    logging.info(f"Running {extract_daily_data.__name__}")
 
     # setup paths
     p = Path()
     incoming_path = p / 'incoming'
 
-    schema_overrides = {
-        'Date': pl.Date(),
-        'Migrants arrived': pl.Int16(),
-        'Boats arrived': pl.Int16(),
-        'Boats arrived - involved in uncontrolled landings': pl.Int16(),
-        'Notes': pl.String()
-    }
-
-    schema = [
-        'date_ending',
-        'migrants_arrived',
-        'boats_arrived',
-        'boats_arrived_involved_in_uncontrolled_landings',
-        'notes',
-        'source'
-    ]
-
+    # skip files that have already been merged
+    ensure_meta_tables(con)
     all_data = []
-    for f in incoming_path.glob('*.ods'):
-        _df = pl.read_ods(
-            source=f,
-            schema_overrides=schema_overrides,
-            sheet_name='SB_01'
-        )
+    ingested_files = []
+    for f in sort_releases(incoming_path.glob('*.ods')):
+        file_size, content_hash = file_fingerprint(f)
+        if is_ingested(con, content_hash, SHEET_NAME):
+            logging.info(f"Skipping {f.name} ({SHEET_NAME}), already ingested")
+            continue
+
+        _df = read_release_sheets(f)[SHEET_NAME]
         _df = _df.with_columns(
             pl.lit(f.name).alias('source')
         )
         all_data.append(_df)
+        ingested_files.append((f.name, file_size, content_hash, _df.height))
 
-    # create the polars dataframe
-    df = pl.concat(all_data)
+    if not all_data:
+        logging.info("No new files to ingest")
+        return None
 
-    # apply the expected table schema for column names
-    df.columns = schema
-
-    # sort by date descending (latest first)
-    df = df.sort(by=pl.col('date_ending'), descending=True)
+    add_to_span(rows_in=sum(_df.height for _df in all_data))
 
-    # add sdc flags for upsert and merging
     current_date = datetime.now().date()
-    df = df.with_columns(
-        pl.lit(True).alias('is_current'),
-        pl.lit(current_date).alias('begin_date').cast(pl.Date()),
-        pl.lit(None).alias('end_date').cast(pl.Date())
-    )
-
-    # register the df for ingestion into the database
-    con.register('polarsDF', df)
+    df = prepare_daily_data(all_data, current_date)
 
     # upsert and merge
-    try:
-        logging.info("Attempting merge...")
-        con.sql(f"""
-        MERGE into {table_name} AS target
-        USING polarsDF AS source
-        ON target.date_ending = source.date_ending
-        AND target.is_current = true
-        WHEN MATCHED AND (
-               target.migrants_arrived <> source.migrants_arrived OR
-               target.boats_arrived    <> source.boats_arrived    OR
-               target.boats_arrived_involved_in_uncontrolled_landings  <> source.boats_arrived_involved_in_uncontrolled_landings OR
-               target.notes <> source.notes
-            ) THEN UPDATE SET
-            end_date    = CURRENT_DATE - INTERVAL '1 day',
-            is_current  = false
-        WHEN NOT MATCHED BY SOURCE AND target.is_current = true THEN UPDATE SET
-            end_date    = CURRENT_DATE - INTERVAL '1 day',
-            is_current  = false
-        WHEN NOT MATCHED BY TARGET THEN INSERT (
-            record_id,
-            date_ending,
-            migrants_arrived,
-            boats_arrived,
-            boats_arrived_involved_in_uncontrolled_landings,
-            notes,
-            source,
-            is_current,
-            begin_date,
-            end_date
-        ) VALUES (
-            nextval('duck_record_sequence'),
-            source.date_ending,
-            source.migrants_arrived,
-            source.boats_arrived,
-            source.boats_arrived_involved_in_uncontrolled_landings,
-            source.notes,
-            source.source,
-            source.is_current,
-            source.begin_date,
-            source.end_date
-        )
-        """)
-        logging.info(f"Updated -> {table_name}")
-    except Exception as e:
-        con.close()
-        logging.critical(f"Something went wrong -> {e}")
+    logging.info("Attempting merge...")
+    result = merge_daily_data(con, df, current_date)
+    if result.changed:
+        logging.info(f"Updated -> {TABLE_NAME}")
+    add_to_span(rows_out=result.inserted + result.expired)
+    for file_name, file_size, content_hash, row_count in ingested_files:
+        record_ingest(con, file_name, file_size, content_hash, SHEET_NAME, row_count)
 
-    con.close()
-    logging.info("Connection to duckdb closed")
+    return result
 
 if __name__ == "__main__":
-    extract_daily_data()
\ No newline at end of file
+    run_standalone(extract_daily_data.__name__, extract_daily_data)
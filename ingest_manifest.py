@@ -0,0 +1,60 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_TABLE = "meta.ingest_manifest"
+CREATE_META_TABLES_SQL = (Path(__file__).parent / 'queries' / 'create_meta_tables.sql').read_text()
+
+
+def ensure_meta_tables(con):
+    """
+    Creates the meta schema and its bookkeeping tables if they do not exist.
+
+    Args:
+        con: an open read-write duckdb connection
+    Returns:
+        None
+    """
+
+    con.sql(CREATE_META_TABLES_SQL)
+
+
+def is_ingested(con, content_hash, sheet_name):
+    """
+    Checks whether a sheet of a file with the given content hash has already been
+    merged into the database.
+
+    Args:
+        con: an open duckdb connection
+        content_hash: sha256 hex digest of the file
+        sheet_name: name of the sheet, e.g. SB_01
+    Returns:
+        bool
+    """
+
+    return con.execute(
+        f"SELECT count(*) FROM {MANIFEST_TABLE} WHERE content_hash = ? AND sheet_name = ?",
+        [content_hash, sheet_name]
+    ).fetchone()[0] > 0
+
+
+def record_ingest(con, file_name, file_size, content_hash, sheet_name, row_count):
+    """
+    Records a successfully merged sheet in the ingest manifest.
+
+    Args:
+        con: an open read-write duckdb connection
+        file_name: name of the source file
+        file_size: size of the source file in bytes
+        content_hash: sha256 hex digest of the file
+        sheet_name: name of the sheet, e.g. SB_01
+        row_count: number of rows read from the sheet
+    Returns:
+        None
+    """
+
+    con.execute(
+        f"INSERT INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+        [file_name, file_size, content_hash, sheet_name, row_count, datetime.now()]
+    )
+    logging.info(f"Recorded {file_name} ({sheet_name}) in {MANIFEST_TABLE}")
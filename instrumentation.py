@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from functools import wraps
+
+try:
+    import resource
+except ImportError:
+    # windows has no getrusage, process peak rss is left empty there
+    resource = None
+
+PIPELINE_RUNS_TABLE = "meta.pipeline_runs"
+
+# the run and span the current thread is inside, copied into worker threads by
+# asyncio.to_thread and pipeline.run_stages so nested spans find their parent
+_current_run = ContextVar('current_run', default=None)
+_current_span = ContextVar('current_span', default=None)
+
+
+def _process_peak_rss_bytes():
+    # the high-water mark of the whole process so far, not of a single span
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class Span:
+    name: str
+    parent: str = None
+    started_at: datetime = None
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    process_peak_rss_bytes: int = None
+    rows_in: int = None
+    rows_out: int = None
+    bytes_downloaded: int = None
+    payload_bytes: int = None
+    status: str = 'ok'
+    error: str = None
+    _wall_start: float = field(default=None, repr=False)
+    _cpu_start: float = field(default=None, repr=False)
+
+    @property
+    def path(self):
+        return f"{self.parent}/{self.name}" if self.parent else self.name
+
+    def add(self, rows_in=None, rows_out=None, bytes_downloaded=None, payload_bytes=None):
+        """
+        Adds to the row and byte counters of the span, counters that were never
+        added to stay empty.
+
+        Args:
+            rows_in: rows read by the span
+            rows_out: rows written or returned by the span
+            bytes_downloaded: bytes received over http
+            payload_bytes: bytes sent to the browser by a dashboard render
+        Returns:
+            None
+        """
+
+        if rows_in is not None:
+            self.rows_in = (self.rows_in or 0) + rows_in
+        if rows_out is not None:
+            self.rows_out = (self.rows_out or 0) + rows_out
+        if bytes_downloaded is not None:
+            self.bytes_downloaded = (self.bytes_downloaded or 0) + bytes_downloaded
+        if payload_bytes is not None:
+            self.payload_bytes = (self.payload_bytes or 0) + payload_bytes
+
+    def _start(self):
+        self.started_at = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def _stop(self):
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.process_time() - self._cpu_start
+        self.process_peak_rss_bytes = _process_peak_rss_bytes()
+
+
+@dataclass
+class PipelineRun:
+    name: str
+    root: Span = None
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    spans: list = field(default_factory=list)
+
+
+@contextmanager
+def span(name):
+    """
+    Times the block as a named span: wall time, process cpu time and the peak
+    rss the process has reached by the time it ends, which a span only raises
+    when it needed more memory than anything before it. Rows and bytes are recorded by the block
+    with span.add. Spans nest, the path of a span is its parent's path and its
+    name, e.g. daily/merge raw.migrants_arrived_daily. Finished spans are kept
+    by the enclosing pipeline_run, if any.
+
+    CPU time is for the whole process, so spans running side by side on
+    different threads each count the other's work too.
+
+    Usable as a decorator through instrumented.
+
+    Args:
+        name: name of the span
+    Yields:
+        Span
+    """
+
+    parent = _current_span.get()
+    s = Span(name=name, parent=parent.path if parent else None)
+    token = _current_span.set(s)
+    s._start()
+    try:
+        yield s
+    except BaseException as e:
+        s.status = 'failed'
+        s.error = repr(e)
+        raise
+    finally:
+        s._stop()
+        _current_span.reset(token)
+        run = _current_run.get()
+        if run is not None:
+            run.spans.append(s)
+        logging.debug(f"Span {s.path} {s.status} in {s.wall_seconds:.2f}s ({s.cpu_seconds:.2f}s cpu)")
+
+
+def instrumented(name=None):
+    """
+    Decorator that runs every call of the function inside a span.
+
+    Args:
+        name: name of the span, defaults to the function name
+    Returns:
+        decorator
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_to_span(rows_in=None, rows_out=None, bytes_downloaded=None, payload_bytes=None):
+    """
+    Adds to the counters of the innermost open span, does nothing outside of
+    any span, so instrumented code also runs uninstrumented.
+
+    Args:
+        rows_in: rows read by the span
+        rows_out: rows written or returned by the span
+        bytes_downloaded: bytes received over http
+        payload_bytes: bytes sent to the browser by a dashboard render
+    Returns:
+        None
+    """
+
+    s = _current_span.get()
+    if s is not None:
+        s.add(rows_in=rows_in, rows_out=rows_out, bytes_downloaded=bytes_downloaded, payload_bytes=payload_bytes)
+
+
+@contextmanager
+def pipeline_run(name):
+    """
+    Collects every span that finishes inside the block. The block itself is
+    the root span of the run, named after it, and spans opened directly inside
+    it are its children.
+
+    Args:
+        name: name of the run, e.g. execute_all
+    Yields:
+        PipelineRun
+    """
+
+    run = PipelineRun(name=name)
+    run_token = _current_run.set(run)
+    try:
+        with span(name) as root:
+            run.root = root
+            yield run
+    finally:
+        _current_run.reset(run_token)
+
+
+def clear_context():
+    """
+    Forgets the run and span the current thread is inside, e.g. ones left open
+    by a script that was cut short before it could close them, so spans opened
+    afterwards do not nest under them.
+
+    Returns:
+        None
+    """
+
+    _current_run.set(None)
+    _current_span.set(None)
+
+
+def log_run_summary(run):
+    """
+    Logs one line per span of a run, in the order they started.
+
+    Args:
+        run: PipelineRun
+    Returns:
+        None
+    """
+
+    for s in sorted(run.spans, key=lambda s: s.started_at):
+        counters = ", ".join(
+            f"{label} {value:,}" for label, value in (
+                ('rows in', s.rows_in), ('rows out', s.rows_out), ('bytes', s.bytes_downloaded)
+            ) if value is not None
+        )
+        rss = (
+            f", process peak rss {s.process_peak_rss_bytes / 2**20:,.0f} MB"
+            if s.process_peak_rss_bytes is not None else ""
+        )
+        logging.info(
+            f"{s.path}: {s.status} in {s.wall_seconds:.2f}s ({s.cpu_seconds:.2f}s cpu{rss})"
+            + (f", {counters}" if counters else "")
+        )
+
+
+def runs_spool_path(db_path):
+    """
+    Returns the file next to the database that keeps the runs which published
+    nothing, so recording them never changes the database file and the
+    dashboard's caches survive a run that found nothing new.
+
+    Args:
+        db_path: path to the duckdb database file
+    Returns:
+        str
+    """
+
+    return f"{db_path}.runs.jsonl"
+
+
+def _span_rows(run):
+    # the run is usually recorded from inside itself, while its root is open
+    spans = list(run.spans)
+    if all(s is not run.root for s in spans):
+        root = replace(run.root)
+        root._stop()
+        spans.append(root)
+
+    now = datetime.now()
+    return [
+        [run.run_id, run.name, s.path, s.parent, s.started_at, s.wall_seconds, s.cpu_seconds,
+         s.process_peak_rss_bytes, s.rows_in, s.rows_out, s.bytes_downloaded, s.payload_bytes,
+         s.status, s.error, now]
+        for s in spans
+    ]
+
+
+def spool_pipeline_run(run, spool_path):
+    """
+    Appends the spans finished so far in a run to the spool file, one json
+    line per span in the column order of the pipeline runs table. Hold the
+    ingest lock while spooling.
+
+    Args:
+        run: PipelineRun
+        spool_path: output of runs_spool_path
+    Returns:
+        None
+    """
+
+    rows = _span_rows(run)
+    with open(spool_path, 'a') as f:
+        for row in rows:
+            f.write(json.dumps(row, default=datetime.isoformat) + "\n")
+    logging.info(f"Spooled {len(rows)} spans of run {run.run_id} -> {spool_path}")
+
+
+def read_spooled_runs(spool_path):
+    """
+    Reads the spans written by spool_pipeline_run.
+
+    Args:
+        spool_path: output of runs_spool_path
+    Returns:
+        list of rows in the column order of the pipeline runs table, empty
+        when nothing is spooled
+    """
+
+    if not os.path.exists(spool_path):
+        return []
+    with open(spool_path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        # started_at and recorded_at
+        for i in (4, 14):
+            if row[i] is not None:
+                row[i] = datetime.fromisoformat(row[i])
+    return rows
+
+
+def record_pipeline_run(con, run, spool_path=None):
+    """
+    Appends the spans finished so far in a run to the pipeline runs table. The
+    root span is still open while a run records itself, so it is written with
+    the time taken up to now.
+
+    Runs waiting in the spool are recorded along with it, skipping any already
+    in the table. The caller removes the spool once the database is published.
+
+    Args:
+        con: an open read-write duckdb connection
+        run: PipelineRun
+        spool_path: output of runs_spool_path, or None to record only this run
+    Returns:
+        None
+    """
+
+    rows = _span_rows(run)
+    spooled = read_spooled_runs(spool_path) if spool_path else []
+    if spooled:
+        # a spool left behind by a publish that died before removing it
+        recorded = {r[0] for r in con.execute(
+            f"SELECT DISTINCT run_id FROM {PIPELINE_RUNS_TABLE} WHERE list_contains(?, run_id)",
+            [sorted({row[0] for row in spooled})]
+        ).fetchall()}
+        rows = [row for row in spooled if row[0] not in recorded] + rows
+
+    con.executemany(
+        f"INSERT INTO {PIPELINE_RUNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    spooled_runs = len({row[0] for row in rows}) - 1
+    logging.info(
+        f"Recorded {len(rows)} spans of run {run.run_id}"
+        + (f" and {spooled_runs} spooled runs" if spooled_runs else "")
+        + f" in {PIPELINE_RUNS_TABLE}"
+    )
@@ -0,0 +1,82 @@
+import logging
+import duckdb
+from pathlib import Path
+from data_access import query
+from period_totals import compute_period_totals
+
+KPI_SUMMARY_TABLE = "latest.kpi_summary"
+KPI_SUMMARY_SQL = (Path(__file__).parent / 'queries' / 'kpi_summary.sql').read_text()
+
+
+def refresh_kpi_summary(con):
+    """
+    Materialises the dashboard headline metrics (latest day, week, month and year
+    totals alongside their comparison periods) into a single row table so the
+    dashboard does not have to aggregate the daily history on every render.
+
+    Args:
+        con: an open read-write duckdb connection
+    Returns:
+        None
+    """
+
+    con.sql(f"CREATE OR REPLACE TABLE {KPI_SUMMARY_TABLE} AS ({KPI_SUMMARY_SQL})")
+    logging.info(f"Updated -> {KPI_SUMMARY_TABLE}")
+
+
+def read_kpi_summary():
+    """
+    Reads the precomputed headline metrics. Falls back to computing the same row
+    on the fly when the database has not been refreshed by an ingest run yet.
+
+    Args:
+        None
+    Returns:
+        dict of metric name to value, or None while the daily or 7-day table is
+        still empty
+    """
+
+    try:
+        df = query(f"SELECT * FROM {KPI_SUMMARY_TABLE};")
+    except duckdb.CatalogException:
+        df = query(KPI_SUMMARY_SQL)
+
+    # the query joins the latest 7-day figure with the daily totals, so there
+    # is no row until both have been ingested
+    if df.is_empty():
+        return None
+    return df.row(0, named=True)
+
+
+def compute_kpi_summary(daily, seven_day):
+    """
+    Computes the same headline metrics as queries/kpi_summary.sql from daily and
+    7-day frames, e.g. a snapshot reconstructed with point_in_time.snapshot_as_of.
+
+    Args:
+        daily: daily figures with date_ending and migrants_arrived columns
+        seven_day: preliminary 7-day figures with the same columns
+    Returns:
+        dict of metric name to value, keyed like read_kpi_summary, or None when
+        either frame is empty
+    """
+
+    if daily.is_empty() or seven_day.is_empty():
+        return None
+
+    preliminary = seven_day.sort('date_ending', descending=True).row(0, named=True)
+    latest_date = daily['date_ending'].max()
+    totals = compute_period_totals(daily, as_of=latest_date)
+
+    return {
+        'latest_preliminary_date': preliminary['date_ending'],
+        'latest_migrants_arrived': preliminary['migrants_arrived'],
+        'latest_date': latest_date,
+        'comparison_migrants_arrived': totals['day'].previous,
+        'current_week_total_migrants_arrived': totals['week'].current,
+        'previous_week_total_migrants_arrived': totals['week'].previous,
+        'current_month_total_migrants_arrived': totals['month'].current,
+        'previous_month_total_migrants_arrived': totals['month'].previous,
+        'current_year_total_migrants_arrived': totals['year'].current,
+        'previous_year_total_migrants_arrived': totals['year'].previous,
+    }
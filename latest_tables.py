@@ -0,0 +1,68 @@
+import logging
+from pathlib import Path
+
+LATEST_QUERIES_PATH = Path(__file__).parent / 'queries' / 'latest'
+
+# latest table -> the raw table it is built from
+LATEST_TABLES = {
+    'latest.migrants_arrived_7_days': 'raw.migrants_arrived_7_days',
+    'latest.migrants_arrived_weekly': 'raw.migrants_arrived_weekly',
+    'latest.migrants_arrived_daily': 'raw.migrants_arrived_daily',
+}
+
+
+def latest_table_sql(latest_table):
+    """
+    Reads the query a latest table is built from, e.g.
+    queries/latest/migrants_arrived_daily.sql for latest.migrants_arrived_daily.
+
+    Args:
+        latest_table: name of the latest table
+    Returns:
+        str
+    """
+
+    return (LATEST_QUERIES_PATH / f"{latest_table.split('.')[-1]}.sql").read_text()
+
+
+def _table_type(con, table_name):
+    schema, name = table_name.split('.')
+    row = con.execute(
+        # only the default database, not any attached alongside it
+        "SELECT table_type FROM information_schema.tables "
+        "WHERE table_catalog = current_database() AND table_schema = ? AND table_name = ?",
+        [schema, name]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def refresh_latest_tables(con, changed=None):
+    """
+    Materialises the current rows of each raw table into a sorted latest table,
+    so dashboard reads are a plain scan of a small table instead of a filter
+    and sort over the whole history. Only tables whose raw table changed are
+    rebuilt, along with any that are missing or still views.
+
+    Args:
+        con: an open read-write duckdb connection
+        changed: raw table names that changed, or None to rebuild every table
+    Returns:
+        list of the latest tables that were rebuilt
+    """
+
+    refreshed = []
+    for latest_table, raw_table in LATEST_TABLES.items():
+        table_type = _table_type(con, latest_table)
+        if changed is not None and raw_table not in changed and table_type == 'BASE TABLE':
+            continue
+
+        # earlier databases defined these as views
+        if table_type == 'VIEW':
+            con.execute(f"DROP VIEW {latest_table}")
+        con.execute(f"CREATE OR REPLACE TABLE {latest_table} AS ({latest_table_sql(latest_table)})")
+        logging.info(f"Updated -> {latest_table}")
+        refreshed.append(latest_table)
+
+    if not refreshed:
+        logging.info("Latest tables are up to date")
+    return refreshed
@@ -0,0 +1,92 @@
+import streamlit as st
+
+st.set_page_config(
+    page_title="Pipeline runs",
+    layout="wide"
+)
+
+"""
+# Pipeline runs
+
+How long each ingest run and its stages took, how much data and bandwidth they used and the peak memory of the process.
+Runs are recorded by `execute_all` and the standalone ingest scripts, runs that found nothing new wait next to the database until the next one that publishes.
+"""
+
+import duckdb
+import polars as pl
+from chart_helper import pipeline_runs_chart
+from data_access import DB_PATH, query
+from instrumentation import PIPELINE_RUNS_TABLE, read_spooled_runs, runs_spool_path
+
+RECENT_RUNS = 50
+
+try:
+    spans = query(f"""
+    SELECT *
+    FROM {PIPELINE_RUNS_TABLE}
+    WHERE run_id IN (
+        SELECT run_id FROM {PIPELINE_RUNS_TABLE} WHERE parent IS NULL ORDER BY started_at DESC LIMIT ?
+    )
+    ORDER BY started_at
+    """, [RECENT_RUNS])
+except duckdb.CatalogException:
+    # the database predates the pipeline runs table
+    spans = pl.DataFrame()
+
+spooled = read_spooled_runs(runs_spool_path(DB_PATH))
+if spooled and spans.width:
+    spans = pl.concat([spans, pl.DataFrame(spooled, schema=spans.schema, orient='row')])
+    recent = spans.filter(pl.col('parent').is_null()).sort('started_at').tail(RECENT_RUNS)['run_id']
+    spans = spans.filter(pl.col('run_id').is_in(recent.implode())).sort('started_at')
+
+if spans.is_empty():
+    st.info("No pipeline runs have been recorded yet")
+    st.stop()
+
+run_name = st.selectbox("Run", spans['run_name'].unique(maintain_order=True).to_list())
+spans = spans.filter(pl.col('run_name') == run_name)
+runs = spans.filter(pl.col('parent').is_null())
+
+# per run totals, bytes are only counted on the fetch spans so they are summed
+totals = runs.join(
+    spans.group_by('run_id').agg(pl.col('bytes_downloaded').sum().alias('run_bytes_downloaded')),
+    on='run_id'
+).with_columns(
+    (pl.col('process_peak_rss_bytes') / 2**20).alias('process_peak_rss_mb'),
+    (pl.col('run_bytes_downloaded') / 2**20).alias('downloaded_mb')
+)
+
+latest = totals.row(-1, named=True)
+with st.container(horizontal=True, gap="medium"):
+    st.metric("Last run took", f"{latest['wall_seconds']:,.1f}s", border=True)
+    st.metric("CPU time", f"{latest['cpu_seconds']:,.1f}s", border=True)
+    st.metric("Process peak memory", f"{latest['process_peak_rss_mb'] or 0:,.0f} MB", border=True)
+    st.metric("Downloaded", f"{latest['downloaded_mb'] or 0:,.1f} MB", border=True)
+
+"""
+### Run time
+"""
+st.altair_chart(pipeline_runs_chart(totals, 'wall_seconds', "Seconds"), width="stretch")
+
+"""
+### Stage time
+"""
+stages = spans.filter(pl.col('parent') == run_name)
+st.altair_chart(pipeline_runs_chart(stages, 'wall_seconds', "Seconds"), width="stretch")
+
+"""
+### Process peak memory
+"""
+st.altair_chart(pipeline_runs_chart(totals, 'process_peak_rss_mb', "MB"), width="stretch")
+
+f"""
+### Spans of the run started {latest['started_at']:%d %B %Y %H:%M}
+"""
+st.dataframe(
+    spans.filter(pl.col('run_id') == latest['run_id']).select(
+        'span', 'status', 'wall_seconds', 'cpu_seconds', 'process_peak_rss_bytes',
+        'rows_in', 'rows_out', 'bytes_downloaded', 'error'
+    ),
+    hide_index=True,
+    width="stretch"
+)
@@ -0,0 +1,131 @@
+import polars as pl
+from datetime import date, timedelta
+from typing import NamedTuple
+
+
+class PeriodTotal(NamedTuple):
+    current: int
+    previous: int
+
+
+def _add_months(d, months):
+    month_index = d.year * 12 + (d.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _day_windows(as_of):
+    same_day_last_year = as_of - timedelta(days=365)
+    return as_of, as_of + timedelta(days=1), same_day_last_year, same_day_last_year + timedelta(days=1)
+
+
+def _week_windows(as_of):
+    start_of_week = as_of - timedelta(days=as_of.weekday())
+    return start_of_week, start_of_week + timedelta(days=7), start_of_week - timedelta(days=7), start_of_week
+
+
+def _month_windows(as_of):
+    start_of_month = date(as_of.year, as_of.month, 1)
+    return start_of_month, _add_months(start_of_month, 1), _add_months(start_of_month, -1), start_of_month
+
+
+def _quarter_windows(as_of):
+    start_of_quarter = date(as_of.year, 3 * ((as_of.month - 1) // 3) + 1, 1)
+    return start_of_quarter, _add_months(start_of_quarter, 3), _add_months(start_of_quarter, -3), start_of_quarter
+
+
+def _year_windows(as_of):
+    start_of_year = date(as_of.year, 1, 1)
+    return start_of_year, date(as_of.year + 1, 1, 1), date(as_of.year - 1, 1, 1), start_of_year
+
+
+def _financial_year_windows(as_of):
+    # uk government financial years run from 1 April to 31 March
+    start_year = as_of.year if as_of.month >= 4 else as_of.year - 1
+    start_of_financial_year = date(start_year, 4, 1)
+    return start_of_financial_year, date(start_year + 1, 4, 1), date(start_year - 1, 4, 1), start_of_financial_year
+
+
+def _rolling_28_day_windows(as_of):
+    end = as_of + timedelta(days=1)
+    start = end - timedelta(days=28)
+    return start, end, start - timedelta(days=28), start
+
+
+# each entry returns (current_start, current_end, previous_start, previous_end)
+# as half-open [start, end) date windows for the given as of date
+PERIOD_WINDOWS = {
+    'day': _day_windows,
+    'week': _week_windows,
+    'month': _month_windows,
+    'quarter': _quarter_windows,
+    'year': _year_windows,
+    'financial_year': _financial_year_windows,
+    'rolling_28_days': _rolling_28_day_windows,
+}
+
+DEFAULT_PERIODS = ('day', 'week', 'month', 'year')
+
+
+def compute_period_totals(
+        df,
+        as_of=None,
+        periods=DEFAULT_PERIODS,
+        date_column='date_ending',
+        value_column='migrants_arrived'
+):
+    """
+    Computes current and previous totals for several reporting periods in a
+    single pass over the data. Every period window becomes a conditional sum in
+    one lazy select, so adding periods does not add scans.
+
+    Current periods are "to date": they never include rows after the as of date.
+    Previous periods are complete, e.g. the whole of last year for 'year', and
+    'day' compares against the same day 365 days earlier.
+
+    Args:
+        df: polars dataframe or lazyframe of daily figures
+        as_of: the reporting date, defaults to the latest date in the data
+        periods: names from PERIOD_WINDOWS, or a mapping of name to a callable
+            returning (current_start, current_end, previous_start, previous_end)
+        date_column: name of the date column
+        value_column: name of the column to total
+    Returns:
+        dict of period name to PeriodTotal(current, previous)
+    """
+
+    lf = df.lazy()
+    if as_of is None:
+        as_of = lf.select(pl.col(date_column).max()).collect().item()
+
+    if not isinstance(periods, dict):
+        periods = {name: PERIOD_WINDOWS[name] for name in periods}
+
+    # only rows from the earliest window onwards are needed
+    windows = {name: window(as_of) for name, window in periods.items()}
+    earliest = min(min(w[0], w[2]) for w in windows.values())
+    to_date = as_of + timedelta(days=1)
+
+    d = pl.col(date_column)
+    v = pl.col(value_column)
+    aggregations = []
+    for name, (current_start, current_end, previous_start, previous_end) in windows.items():
+        current_end = min(current_end, to_date)
+        aggregations.append(
+            v.filter((d >= current_start) & (d < current_end)).sum().alias(f"{name}_current")
+        )
+        aggregations.append(
+            v.filter((d >= previous_start) & (d < previous_end)).sum().alias(f"{name}_previous")
+        )
+
+    totals = (
+        lf
+        .filter(d >= earliest)
+        .select(aggregations)
+        .collect()
+        .row(0, named=True)
+    )
+
+    return {
+        name: PeriodTotal(totals[f"{name}_current"], totals[f"{name}_previous"])
+        for name in windows
+    }
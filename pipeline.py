@@ -0,0 +1,142 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple
+from instrumentation import span
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable
+    depends_on: tuple = ()
+    retries: int = 0
+
+
+class StageResult(NamedTuple):
+    name: str
+    status: str
+    value: object
+    seconds: float
+    attempts: int
+    error: BaseException = None
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+
+def _check_graph(stages):
+    names = [stage.name for stage in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate stage names in {names}")
+    for stage in stages:
+        unknown = set(stage.depends_on) - set(names)
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {sorted(unknown)}")
+
+    # repeatedly peel off stages whose dependencies are all peeled, what is left is a cycle
+    remaining = {stage.name: set(stage.depends_on) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+        if not ready:
+            raise ValueError(f"Stages {sorted(remaining)} form a dependency cycle")
+        for name in ready:
+            del remaining[name]
+
+
+def _run_stage(stage, inputs, retry_delay):
+    start = time.perf_counter()
+    with span(stage.name) as s:
+        for attempt in range(1, stage.retries + 2):
+            try:
+                value = stage.run(**inputs)
+                return StageResult(stage.name, 'ok', value, time.perf_counter() - start, attempt)
+            except Exception as e:
+                if attempt > stage.retries:
+                    s.status, s.error = 'failed', repr(e)
+                    return StageResult(stage.name, 'failed', None, time.perf_counter() - start, attempt, e)
+                logging.warning(f"Stage {stage.name} failed (attempt {attempt}), retrying -> {e}")
+                time.sleep(retry_delay * attempt)
+
+
+def run_stages(stages, max_workers=4, retry_delay=1.0):
+    """
+    Runs a graph of stages on a thread pool. Each stage starts as soon as every
+    stage it depends on has succeeded, and is called with their return values
+    as keyword arguments named after them, so independent stages overlap and
+    the run takes as long as its critical path. A failing stage is retried up
+    to stage.retries times; if it still fails, the stages that depend on it are
+    skipped while the rest of the graph carries on. Every stage runs inside an
+    instrumentation span named after it.
+
+    Args:
+        stages: list of Stage(name, run, depends_on, retries)
+        max_workers: number of stages that may run at once
+        retry_delay: seconds to wait before the first retry, growing linearly
+    Returns:
+        dict of stage name to StageResult, in the order the stages were given
+    Raises:
+        ValueError: when names repeat, a dependency is unknown or the graph has a cycle
+    """
+
+    _check_graph(stages)
+
+    start = time.perf_counter()
+    results = {}
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as pool:
+        while pending or running:
+            for stage in list(pending):
+                deps = [results.get(name) for name in stage.depends_on]
+                if any(dep is not None and not dep.ok for dep in deps):
+                    results[stage.name] = StageResult(stage.name, 'skipped', None, 0.0, 0)
+                    logging.warning(f"Stage {stage.name} skipped, a dependency did not succeed")
+                    pending.remove(stage)
+                elif all(dep is not None for dep in deps):
+                    inputs = {name: results[name].value for name in stage.depends_on}
+                    # each stage runs in a copy of the caller's context, so its span
+                    # nests under the caller's
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, _run_stage, stage, inputs, retry_delay)] = stage
+                    pending.remove(stage)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result = future.result()
+                results[stage.name] = result
+                if result.ok:
+                    logging.info(f"Stage {stage.name} finished in {result.seconds:.2f}s")
+                else:
+                    logging.error(f"Stage {stage.name} failed after {result.attempts} attempt(s) -> {result.error}")
+
+    wall = time.perf_counter() - start
+    busy = sum(result.seconds for result in results.values())
+    logging.info(f"Ran {len(stages)} stages in {wall:.2f}s ({busy:.2f}s of stage time)")
+
+    return {stage.name: results[stage.name] for stage in stages}
+
+
+def raise_for_failures(results):
+    """
+    Raises if any stage failed or was skipped, naming every one of them.
+
+    Args:
+        results: output of run_stages
+    Returns:
+        None
+    Raises:
+        RuntimeError: listing the stages that did not succeed
+    """
+
+    problems = [
+        f"{result.name}: {result.status}" + (f" -> {result.error!r}" if result.error else "")
+        for result in results.values() if not result.ok
+    ]
+    if problems:
+        raise RuntimeError("Pipeline stages did not succeed:\n" + "\n".join(problems))
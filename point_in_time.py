@@ -0,0 +1,150 @@
+import polars as pl
+from functools import lru_cache
+from pathlib import Path
+from data_access import DB_PATH, database_version, query
+
+AS_OF_MACROS_SQL = (Path(__file__).parent / 'queries' / 'create_as_of_macros.sql').read_text()
+
+# scd table -> business key column
+HISTORY_TABLES = {
+    'raw.migrants_arrived_daily': 'date_ending',
+    'raw.migrants_arrived_weekly': 'week_ending',
+    'raw.migrants_arrived_7_days': 'date_ending',
+}
+
+
+def ensure_as_of_macros(con):
+    """
+    Creates the as_of table macros, so the same point in time queries can be run
+    from SQL, e.g. SELECT * FROM as_of('raw.migrants_arrived_daily', DATE '2026-01-05').
+
+    Args:
+        con: an open read-write duckdb connection
+    Returns:
+        None
+    """
+
+    con.execute(AS_OF_MACROS_SQL)
+
+
+class HistoryIndex:
+    """
+    Every version of an scd table held sorted by (key, begin_date, record_id).
+    The versions of one key occupy a contiguous run, found by binary search on
+    the key, and within that run the version published on a given day is the
+    last one beginning on or before it, found by a second binary search.
+    """
+
+    def __init__(self, df, key_column):
+        self.key_column = key_column
+        self.df = df
+        self._keys = df[key_column]
+        self._begin_dates = df['begin_date']
+
+    def _key_range(self, since, until):
+        start = self._keys.search_sorted(since, side='left') if since is not None else 0
+        end = self._keys.search_sorted(until, side='right') if until is not None else self.df.height
+        return start, end
+
+    def row(self, key, as_of):
+        """
+        Returns the version of one key as published on as_of.
+
+        Args:
+            key: business key value, e.g. a date_ending
+            as_of: publication date to look the key up at
+        Returns:
+            dict of column name to value, or None when the key was not published yet
+        """
+
+        start, end = self._key_range(key, key)
+        if start == end:
+            return None
+
+        # last version beginning on or before as_of
+        position = start + self._begin_dates.slice(start, end - start).search_sorted(as_of, side='right') - 1
+        if position < start:
+            return None
+
+        row = self.df.row(position, named=True)
+        if row['end_date'] is not None and row['end_date'] < as_of:
+            return None
+        return row
+
+    def snapshot(self, as_of, since=None, until=None):
+        """
+        Returns every key as published on as_of, optionally restricted to keys
+        in [since, until]. The key range is located by binary search, so a
+        narrow range only inspects the versions of the keys inside it.
+
+        Args:
+            as_of: publication date to reconstruct
+            since: optional first key to include
+            until: optional last key to include
+        Returns:
+            pl.DataFrame ordered by key
+        """
+
+        start, end = self._key_range(since, until)
+        return self.df.slice(start, end - start).filter(
+            (pl.col('begin_date') <= as_of)
+            & (pl.col('end_date').is_null() | (pl.col('end_date') >= as_of))
+        )
+
+
+@lru_cache(maxsize=8)
+def _history_index(table_name, version, db_path):
+    key_column = HISTORY_TABLES[table_name]
+    df = query(
+        f"SELECT * FROM {table_name} ORDER BY {key_column}, begin_date, record_id",
+        db_path=db_path
+    )
+    return HistoryIndex(df.set_sorted(key_column), key_column)
+
+
+def history_index(table_name, db_path=DB_PATH):
+    """
+    Returns the HistoryIndex for a table, loaded once per version of the
+    database file.
+
+    Args:
+        table_name: one of HISTORY_TABLES
+        db_path: path to the duckdb database file
+    Returns:
+        HistoryIndex
+    """
+
+    return _history_index(table_name, database_version(db_path), db_path)
+
+
+def row_as_of(table_name, key, as_of, db_path=DB_PATH):
+    """
+    Returns a figure as it was published on a past day.
+
+    Args:
+        table_name: one of HISTORY_TABLES
+        key: business key value, e.g. the date_ending to look up
+        as_of: publication date
+        db_path: path to the duckdb database file
+    Returns:
+        dict of column name to value, or None when it was not published yet
+    """
+
+    return history_index(table_name, db_path).row(key, as_of)
+
+
+def snapshot_as_of(table_name, as_of, since=None, until=None, db_path=DB_PATH):
+    """
+    Reconstructs a table as it was published on a past day.
+
+    Args:
+        table_name: one of HISTORY_TABLES
+        as_of: publication date
+        since: optional first key to include
+        until: optional last key to include
+        db_path: path to the duckdb database file
+    Returns:
+        pl.DataFrame ordered by key
+    """
+
+    return history_index(table_name, db_path).snapshot(as_of, since, until)
@@ -0,0 +1,181 @@
+import logging
+import os
+import shutil
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # windows has no fcntl, msvcrt locks a byte range instead
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def ingest_lock(db_path='migrant_crossings_db.duckdb'):
+    """
+    Holds an exclusive lock on <db_path>.lock for the duration of the block, so
+    overlapping runs (e.g. two cron jobs) never write the database at the same
+    time. The lock belongs to the process and is released by the operating
+    system if it dies.
+
+    Args:
+        db_path: path to the duckdb database file
+    Yields:
+        None
+    Raises:
+        RuntimeError: when another process already holds the lock
+    """
+
+    lock_path = f"{db_path}.lock"
+    with open(lock_path, 'a+') as f:
+        try:
+            _try_lock(f)
+        except OSError:
+            raise RuntimeError(f"Another ingest is already running, {lock_path} is locked")
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+class NothingToPublish(Exception):
+    """
+    Raised inside staged_database to discard the staging copy without failing,
+    when the block changed nothing worth publishing.
+    """
+
+
+def _discard(staging_path):
+    for path in (staging_path, f"{staging_path}.wal"):
+        if os.path.exists(path):
+            os.remove(path)
+    logging.info(f"Discarded -> {staging_path}")
+
+
+@contextmanager
+def staged_database(db_path='migrant_crossings_db.duckdb'):
+    """
+    Yields a read-write connection to a staging copy of the database. When the
+    block completes, the copy is checkpointed and atomically swapped into place
+    with os.replace, so readers only ever see a complete file and never share it
+    with a writer. Connections opened before the swap keep reading the old file
+    until they reopen. When the block raises, the copy is discarded and the
+    database is left untouched, and when it raises NothingToPublish that is
+    all that happens, so the file and everything cached from it stay as they
+    are.
+
+    Hold ingest_lock around this, two stagings of the same file would each
+    publish over the other.
+
+    Args:
+        db_path: path to the duckdb database file
+    Yields:
+        duckdb.DuckDBPyConnection
+    """
+
+    import duckdb
+
+    staging_path = f"{db_path}.staging"
+    for path in (staging_path, f"{staging_path}.wal"):
+        if os.path.exists(path):
+            os.remove(path)
+
+    # copyfile rather than copy2, so the published file gets a fresh mtime
+    if os.path.exists(db_path):
+        shutil.copyfile(db_path, staging_path)
+        if os.path.exists(f"{db_path}.wal"):
+            shutil.copyfile(f"{db_path}.wal", f"{staging_path}.wal")
+
+    con = duckdb.connect(staging_path)
+    try:
+        yield con
+        con.execute("CHECKPOINT")
+    except NothingToPublish:
+        con.close()
+        _discard(staging_path)
+        return
+    except BaseException:
+        con.close()
+        _discard(staging_path)
+        raise
+
+    con.close()
+    # a leftover write-ahead log was copied into staging and checkpointed, and
+    # must not be replayed onto the new file
+    if os.path.exists(f"{db_path}.wal"):
+        os.remove(f"{db_path}.wal")
+    os.replace(staging_path, db_path)
+    logging.info(f"Published -> {db_path}")
+
+
+def run_standalone(name, ingest_fn, db_path='migrant_crossings_db.duckdb'):
+    """
+    Runs one ingest on its own, as its script does: holds the ingest lock, runs
+    ingest_fn against a staging copy of the database and, when the raw table
+    changed, refreshes the latest tables and kpi summary, records the run's
+    timings in meta.pipeline_runs and publishes the copy if all of it
+    succeeded. A run that changed nothing publishes nothing, its timings wait
+    in the runs spool for the next run that does. Errors are logged rather
+    than raised.
+
+    Args:
+        name: name of the run, e.g. extract_daily_data
+        ingest_fn: callable taking the open connection and returning a
+            MergeResult, or None when there was nothing to merge
+        db_path: path to the duckdb database file
+    Returns:
+        the result of ingest_fn, or None when the run failed
+    """
+
+    # imported here, so the lock and staging stay cheap to import for execute_all
+    from instrumentation import (
+        log_run_summary, pipeline_run, record_pipeline_run, runs_spool_path, spool_pipeline_run
+    )
+    from kpi_summary import refresh_kpi_summary
+    from latest_tables import refresh_latest_tables
+
+    # setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    try:
+        spool_path = runs_spool_path(db_path)
+        with ingest_lock(db_path), pipeline_run(name) as run:
+            with staged_database(db_path) as con:
+                result = ingest_fn(con)
+                changed = result is not None and result.changed
+                if not changed:
+                    # republishing an unchanged file would only invalidate the dashboard's caches
+                    raise NothingToPublish
+                if refresh_latest_tables(con, {result.table_name}):
+                    refresh_kpi_summary(con)
+                record_pipeline_run(con, run, spool_path)
+            if changed:
+                # the spooled runs were published with this one
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
+            else:
+                spool_pipeline_run(run, spool_path)
+        log_run_summary(run)
+    except Exception as e:
+        logging.critical(f"Something went wrong -> {e}")
+        return None
+    return result
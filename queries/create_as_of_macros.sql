@@ -0,0 +1,9 @@
+-- point in time reads over the scd-2 raw tables, e.g.
+--   SELECT * FROM as_of('raw.migrants_arrived_daily', DATE '2026-01-05') WHERE date_ending = DATE '2025-12-31';
+-- returns each key as it was published on as_of_date: the version that had begun
+-- by then and had not yet been replaced
+CREATE OR REPLACE MACRO as_of(table_name, as_of_date) AS TABLE
+SELECT *
+FROM query_table(table_name)
+WHERE begin_date <= as_of_date
+  AND (end_date IS NULL OR end_date >= as_of_date);
@@ -0,0 +1,48 @@
+CREATE SCHEMA IF NOT EXISTS meta;
+
+CREATE TABLE IF NOT EXISTS meta.ingest_manifest (
+    file_name VARCHAR,
+    file_size BIGINT,
+    content_hash VARCHAR,
+    sheet_name VARCHAR,
+    row_count BIGINT,
+    ingested_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS meta.http_cache (
+    url VARCHAR,
+    etag VARCHAR,
+    last_modified VARCHAR,
+    content_hash VARCHAR,
+    fetched_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS meta.revisions (
+    table_name VARCHAR,
+    key_date DATE,
+    metric VARCHAR,
+    change VARCHAR,
+    previous_value VARCHAR,
+    current_value VARCHAR,
+    source VARCHAR,
+    as_of DATE,
+    recorded_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS meta.pipeline_runs (
+    run_id VARCHAR,
+    run_name VARCHAR,
+    span VARCHAR,
+    parent VARCHAR,
+    started_at TIMESTAMP,
+    wall_seconds DOUBLE,
+    cpu_seconds DOUBLE,
+    process_peak_rss_bytes BIGINT,
+    rows_in BIGINT,
+    rows_out BIGINT,
+    bytes_downloaded BIGINT,
+    payload_bytes BIGINT,
+    status VARCHAR,
+    error VARCHAR,
+    recorded_at TIMESTAMP
+);
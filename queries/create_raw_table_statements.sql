@@ -1,6 +1,15 @@
+create schema if not exists raw;
+create schema if not exists latest;
+create sequence if not exists duck_record_sequence start 1;
+
+-- scd tables are kept ordered by (is_current, key, begin_date) by scd2.cluster_scd2,
+-- run by merges once enough history sits among the current rows and by rebuild.py,
+-- so zone maps skip history when reading current rows, and each business key
+-- has an ART index (named by scd2.key_index_name) for point lookups
+
 create or replace table raw.migrants_arrived_7_days(
     record_id BIGINT,
-    date DATE,
+    date_ending DATE,
     migrants_arrived INT,
     boats_arrived INT,
     boats_arrived_involved_in_uncontrolled_landings INT,
@@ -8,8 +17,10 @@ create or replace table raw.migrants_arrived_7_days(
     source VARCHAR,
     is_current BOOLEAN,
     begin_date DATE,
-    end_date DATE
+    end_date DATE,
+    row_hash UBIGINT
  );
+create index if not exists migrants_arrived_7_days_key_idx on raw.migrants_arrived_7_days (date_ending);
 
 create or replace table raw.migrants_arrived_weekly (
     record_id BIGINT,
@@ -23,12 +34,14 @@ create or replace table raw.migrants_arrived_weekly (
     source VARCHAR,
     is_current BOOLEAN,
     begin_date DATE,
-    end_date DATE
+    end_date DATE,
+    row_hash UBIGINT
  );
+create index if not exists migrants_arrived_weekly_key_idx on raw.migrants_arrived_weekly (week_ending);
 
  create or replace table raw.migrants_arrived_daily (
     record_id BIGINT,
-    day_ending DATE,
+    date_ending DATE,
     migrants_arrived INT,
     boats_arrived INT,
     boats_arrived_involved_in_uncontrolled_landings INT,
@@ -36,5 +49,7 @@ create or replace table raw.migrants_arrived_weekly (
     source VARCHAR,
     is_current BOOLEAN,
     begin_date DATE,
-    end_date DATE
- );
\ No newline at end of file
+    end_date DATE,
+    row_hash UBIGINT
+ );
+create index if not exists migrants_arrived_daily_key_idx on raw.migrants_arrived_daily (date_ending);
@@ -0,0 +1,40 @@
+WITH daily AS (
+       SELECT
+         date_ending,
+         migrants_arrived
+       FROM latest.migrants_arrived_daily
+),
+preliminary AS (
+       SELECT
+         date_ending,
+         migrants_arrived
+       FROM latest.migrants_arrived_7_days
+       ORDER BY date_ending DESC
+       LIMIT 1
+),
+windows AS (
+       SELECT
+         latest_date,
+         CAST(latest_date - INTERVAL 365 DAY AS DATE) AS same_day_last_year,
+         CAST(date_trunc('week', latest_date) AS DATE) AS start_of_week,
+         CAST(date_trunc('month', latest_date) AS DATE) AS start_of_month,
+         CAST(date_trunc('month', latest_date) - INTERVAL 1 MONTH AS DATE) AS start_of_previous_month,
+         make_date(year(latest_date) - 1, 1, 1) AS start_of_previous_year,
+         year(latest_date) AS latest_year
+       FROM (SELECT max(date_ending) AS latest_date FROM daily)
+)
+SELECT
+  p.date_ending AS latest_preliminary_date,
+  p.migrants_arrived AS latest_migrants_arrived,
+  w.latest_date,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE d.date_ending = w.same_day_last_year), 0) AS BIGINT) AS comparison_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE d.date_ending >= w.start_of_week), 0) AS BIGINT) AS current_week_total_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE d.date_ending >= w.start_of_week - INTERVAL 7 DAY AND d.date_ending < w.start_of_week), 0) AS BIGINT) AS previous_week_total_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE d.date_ending >= w.start_of_month), 0) AS BIGINT) AS current_month_total_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE d.date_ending >= w.start_of_previous_month AND d.date_ending < w.start_of_month), 0) AS BIGINT) AS previous_month_total_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE year(d.date_ending) = w.latest_year), 0) AS BIGINT) AS current_year_total_migrants_arrived,
+  CAST(coalesce(sum(d.migrants_arrived) FILTER (WHERE year(d.date_ending) = w.latest_year - 1), 0) AS BIGINT) AS previous_year_total_migrants_arrived
+FROM daily AS d, windows AS w, preliminary AS p
+-- every window starts on or after 1 January of the previous year
+WHERE d.date_ending >= w.start_of_previous_year
+GROUP BY ALL
@@ -0,0 +1,12 @@
+SELECT
+  record_id,
+  date_ending,
+  migrants_arrived,
+  boats_arrived,
+  boats_arrived_involved_in_uncontrolled_landings,
+  notes,
+  source
+FROM raw.migrants_arrived_7_days
+WHERE is_current = TRUE
+ORDER BY date_ending DESC
+LIMIT 7
@@ -0,0 +1,13 @@
+SELECT
+  record_id,
+  week_ending,
+  migrants_arrived,
+  boats_arrived,
+  boats_arrived_involved_in_uncontrolled_landings,
+  migrants_prevented,
+  events_prevented,
+  notes,
+  source
+FROM raw.migrants_arrived_weekly
+WHERE is_current = TRUE
+ORDER BY week_ending DESC
@@ -0,0 +1,185 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import duckdb
+import polars as pl
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from ingest_daily_data import prepare_daily_data, merge_daily_data, SHEET_NAME as DAILY_SHEET_NAME
+from ingest_weekly_data import prepare_weekly_data, merge_weekly_data, SHEET_NAME as WEEKLY_SHEET_NAME
+from fetch_cache import CACHE_TABLE
+from ingest_manifest import ensure_meta_tables, record_ingest
+from instrumentation import PIPELINE_RUNS_TABLE
+from kpi_summary import refresh_kpi_summary
+from latest_tables import refresh_latest_tables
+from point_in_time import ensure_as_of_macros
+from publish import ingest_lock
+from scd2 import cluster_scd2
+from release_loader import file_fingerprint, read_release_sheets, release_date
+
+QUERIES_PATH = Path(__file__).parent / 'queries'
+SEVEN_DAY_TABLE = "raw.migrants_arrived_7_days"
+# tables that cannot be rebuilt from the archive, copied across from the existing database
+CARRIED_OVER_TABLES = [SEVEN_DAY_TABLE, PIPELINE_RUNS_TABLE, CACHE_TABLE]
+
+
+def _load_release(path):
+    # runs in a worker process, sidecars written here are reused next time
+    return read_release_sheets(path)
+
+
+def _columns(con, database, table_name):
+    schema, name = table_name.split('.')
+    return dict(con.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() "
+        "WHERE database_name = ? AND schema_name = ? AND table_name = ? ORDER BY column_index",
+        [database, schema, name]
+    ).fetchall())
+
+
+def _carry_over(con, table_name):
+    # copies the columns both files have with the same type. Older databases may
+    # predate a table or some of its columns, or store row_hash wider, which the
+    # next merge then fills in again
+    previous = _columns(con, 'previous', table_name)
+    current = _columns(con, con.execute("SELECT current_database()").fetchone()[0], table_name)
+    columns = [c for c, data_type in current.items() if previous.get(c) == data_type]
+    if columns:
+        con.execute(
+            f"INSERT INTO {table_name} ({', '.join(columns)}) "
+            f"SELECT {', '.join(columns)} FROM previous.{table_name}"
+        )
+        logging.info(f"Carried over -> {table_name}")
+
+
+def rebuild(data_path=Path('data'), db_path='migrant_crossings_db.duckdb', workers=None):
+    """
+    Rebuilds the database from the archived releases in data/. Releases are
+    parsed in a process pool, then replayed in publication order through the
+    same merges the daily and weekly ingests use, each one effective from its
+    release date. The replay runs single threaded in one transaction against a
+    fresh file, so the resulting history is identical on every rebuild, and the
+    file only replaces db_path once everything has committed. The ingest lock
+    is held meanwhile, so no ingest writes to the file being replaced.
+
+    The 7-day data is not archived, and neither the pipeline run history nor
+    the http validators of the last fetch can be replayed, so their tables are
+    copied across from the existing database when there is one.
+
+    Args:
+        data_path: directory holding the .ods releases
+        db_path: path of the database to replace
+        workers: number of parser processes, defaults to the cpu count
+    Returns:
+        None
+    """
+
+    # setup logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    logging.info(f"Running {rebuild.__name__}")
+
+    releases = []
+    for f in Path(data_path).glob('*.ods'):
+        if release_date(f) is None:
+            logging.warning(f"Skipping {f.name}, no release date in the file name")
+            continue
+        releases.append(f)
+    releases.sort(key=release_date)
+
+    if not releases:
+        logging.info("No releases to rebuild from")
+        return
+
+    # parse every release in parallel, spawning workers because forking a process
+    # that has already started polars or duckdb threads can deadlock the child
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        loaded = list(pool.map(_load_release, releases))
+    logging.info(f"Parsed {len(releases)} release(s)")
+
+    # hold off ingests while the replacement is built
+    with ingest_lock(db_path):
+        # build into a fresh file next to the database
+        build_path = f"{db_path}.rebuild"
+        if os.path.exists(build_path):
+            os.remove(build_path)
+
+        con = duckdb.connect(build_path)
+        try:
+            # one thread keeps nextval() assignment order deterministic
+            con.execute("SET threads = 1")
+            carry_over = os.path.exists(db_path)
+            if carry_over:
+                con.execute(f"ATTACH '{db_path}' AS previous (READ_ONLY)")
+            con.execute("BEGIN TRANSACTION")
+            con.execute((QUERIES_PATH / 'create_raw_table_statements.sql').read_text())
+            ensure_meta_tables(con)
+
+            # replay releases in publication order
+            for f, sheets in zip(releases, loaded):
+                as_of = release_date(f)
+                file_size, content_hash = file_fingerprint(f)
+                for sheet_name, prepare, merge in [
+                    (DAILY_SHEET_NAME, prepare_daily_data, merge_daily_data),
+                    (WEEKLY_SHEET_NAME, prepare_weekly_data, merge_weekly_data),
+                ]:
+                    sheet = sheets[sheet_name].with_columns(pl.lit(f.name).alias('source'))
+                    merge(con, prepare([sheet], as_of), as_of)
+                    record_ingest(con, f.name, file_size, content_hash, sheet_name, sheet.height)
+                logging.info(f"Replayed -> {f.name}")
+
+            # carry what is not in the archive over from the existing database
+            if carry_over:
+                for table_name in CARRIED_OVER_TABLES:
+                    _carry_over(con, table_name)
+
+            # continue the sequence after every record id in use
+            next_record_id = con.execute(f"""
+                SELECT coalesce(max(record_id), 0) + 1 FROM (
+                    SELECT record_id FROM raw.migrants_arrived_daily
+                    UNION ALL SELECT record_id FROM raw.migrants_arrived_weekly
+                    UNION ALL SELECT record_id FROM {SEVEN_DAY_TABLE}
+                )
+            """).fetchone()[0]
+            con.execute(f"CREATE OR REPLACE SEQUENCE duck_record_sequence START {next_record_id}")
+
+            # merges only recluster now and then, leave the rebuilt tables fully clustered
+            for table_name, key_column in [
+                ('raw.migrants_arrived_daily', 'date_ending'),
+                ('raw.migrants_arrived_weekly', 'week_ending'),
+                (SEVEN_DAY_TABLE, 'date_ending'),
+            ]:
+                cluster_scd2(con, table_name, [key_column])
+
+            refresh_latest_tables(con)
+            refresh_kpi_summary(con)
+            ensure_as_of_macros(con)
+            con.execute("COMMIT")
+            if carry_over:
+                con.execute("DETACH previous")
+            con.execute("CHECKPOINT")
+        except Exception as e:
+            con.close()
+            os.remove(build_path)
+            logging.critical(f"Something went wrong -> {e}")
+            raise
+
+        con.close()
+        # a leftover write-ahead log belongs to the old file, not the rebuilt one
+        if os.path.exists(f"{db_path}.wal"):
+            os.remove(f"{db_path}.wal")
+        os.replace(build_path, db_path)
+        logging.info(f"Rebuilt -> {db_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the database from the data/ archive")
+    parser.add_argument('--data-path', type=Path, default=Path('data'))
+    parser.add_argument('--db-path', default='migrant_crossings_db.duckdb')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    rebuild(args.data_path, args.db_path, args.workers)
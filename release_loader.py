@@ -0,0 +1,171 @@
+import hashlib
+import logging
+import os
+import polars as pl
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from instrumentation import span
+
+RELEASE_SHEETS = ['SB_01', 'SB_02']
+SIDECAR_DIR = Path('data') / 'parquet'
+
+
+def _stat_key(path):
+    path = Path(path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_size, stat.st_mtime_ns
+
+
+@lru_cache(maxsize=32)
+def _file_fingerprint(path, size, mtime_ns):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """
+    Returns the size and sha256 content hash of a release file. Hashes are cached
+    in-process until the file changes on disk.
+
+    Args:
+        path: path to the file
+    Returns:
+        tuple of (size in bytes, hex digest)
+    """
+
+    return _file_fingerprint(*_stat_key(path))
+
+
+def release_date(path):
+    """
+    Returns the publication date encoded in a release file name, e.g.
+    09_January_2026_Small_boats_-_time_series.ods -> 2026-01-09.
+
+    Args:
+        path: path to the release
+    Returns:
+        datetime.date, or None if the name does not start with a date
+    """
+
+    try:
+        return datetime.strptime('_'.join(Path(path).name.split('_')[:3]), '%d_%B_%Y').date()
+    except ValueError:
+        return None
+
+
+def sort_releases(paths):
+    """
+    Sorts release files by publication date, oldest first. Files without a date
+    in their name go last, in name order.
+
+    Args:
+        paths: iterable of release paths
+    Returns:
+        list of Path
+    """
+
+    return sorted(
+        (Path(p) for p in paths),
+        key=lambda p: (release_date(p) is None, release_date(p) or datetime.min.date(), p.name)
+    )
+
+
+def sidecar_paths(path):
+    """
+    Returns the parquet sidecar location of each sheet of a release, keyed by
+    the sha256 of the workbook, e.g. data/parquet/<sha256>/SB_01.parquet. A
+    release that is republished or edited gets new sidecars, and one moved from
+    incoming/ to data/ keeps its own.
+
+    Args:
+        path: path to the .ods release
+    Returns:
+        dict of sheet name to Path
+    """
+
+    _, content_hash = file_fingerprint(path)
+    return {sheet: SIDECAR_DIR / content_hash / f"{sheet}.parquet" for sheet in RELEASE_SHEETS}
+
+
+def _sidecars_exist(sidecars):
+    # sidecars are written under their final name last, see _write_sidecars
+    return all(s.exists() for s in sidecars.values())
+
+
+def _write_sidecars(sheets, sidecars):
+    for sheet, sidecar in sidecars.items():
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        tmp = sidecar.with_suffix('.parquet.tmp')
+        sheets[sheet].write_parquet(tmp)
+        os.replace(tmp, sidecar)
+
+
+@lru_cache(maxsize=8)
+def _read_release_sheets(path, size, mtime_ns):
+    sidecars = sidecar_paths(path)
+    if _sidecars_exist(sidecars):
+        with span('read_parquet') as s:
+            sheets = {sheet: pl.read_parquet(sidecar) for sheet, sidecar in sidecars.items()}
+            s.add(rows_out=sum(df.height for df in sheets.values()))
+        return sheets
+
+    with span('read_ods') as s:
+        sheets = pl.read_ods(source=path, sheet_name=RELEASE_SHEETS)
+        s.add(rows_out=sum(df.height for df in sheets.values()))
+    _write_sidecars(sheets, sidecars)
+    logging.info(f"Cached {Path(path).name} -> {sidecars[RELEASE_SHEETS[0]].parent}")
+    return sheets
+
+
+def read_release_sheets(path):
+    """
+    Reads the SB_01 (daily) and SB_02 (weekly) sheets of a time series release
+    from a single open of the workbook. Parsed sheets are written to parquet
+    sidecars keyed by the workbook's content hash, which are read instead of
+    the ODS whenever they exist.
+    Results are also cached in-process, so the daily and weekly ingests share
+    one read per file within a run.
+
+    Column types are inferred, callers apply their own schema with
+    `df.cast(schema_overrides, strict=False)`.
+
+    Args:
+        path: path to the .ods release
+    Returns:
+        dict of sheet name to pl.DataFrame
+    """
+
+    return _read_release_sheets(*_stat_key(path))
+
+
+def convert_archive(data_path=Path('data')):
+    """
+    Writes parquet sidecars for every archived release that does not have them
+    yet.
+
+    Args:
+        data_path: directory holding the .ods releases
+    Returns:
+        list of converted release paths
+    """
+
+    converted = []
+    for f in sorted(Path(data_path).glob('*.ods')):
+        if not _sidecars_exist(sidecar_paths(f)):
+            read_release_sheets(f)
+            converted.append(f)
+
+    logging.info(f"Converted {len(converted)} release(s) to parquet")
+    return converted
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    convert_archive()
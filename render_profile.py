@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from instrumentation import add_to_span, clear_context, pipeline_run, span
+
+PROFILE_ENV_VAR = 'DASHBOARD_PROFILE'
+PROFILE_QUERY_PARAM = 'profile'
+# renders kept per span for the percentiles, and how often they are logged
+HISTORY_SIZE = 1000
+LOG_EVERY = 20
+PERCENTILES = (50, 90, 99)
+
+# process-wide state shared by every streamlit session
+_lock = threading.Lock()
+_history = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_renders = 0
+
+
+def profiling_enabled(query_params):
+    """
+    Checks whether this render should be profiled, either for every session
+    with DASHBOARD_PROFILE=1 or for one session with ?profile=1 in its url.
+
+    Args:
+        query_params: st.query_params of the session
+    Returns:
+        bool
+    """
+
+    return os.environ.get(PROFILE_ENV_VAR) == '1' or query_params.get(PROFILE_QUERY_PARAM) == '1'
+
+
+def payload_size(obj):
+    """
+    Estimates how many bytes an element sends to the browser: the json spec of
+    an altair chart, or the in-memory size of a polars dataframe, which is
+    roughly what its arrow serialisation takes.
+
+    Args:
+        obj: alt.Chart or pl.DataFrame
+    Returns:
+        int, or None for anything else
+    """
+
+    if hasattr(obj, 'to_json'):
+        return len(obj.to_json().encode())
+    if hasattr(obj, 'estimated_size'):
+        return obj.estimated_size()
+    return None
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        values: non-empty list of numbers
+        q: percentile between 0 and 100
+    Returns:
+        the value below which q percent of values fall
+    """
+
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+class RenderProfiler:
+    """
+    Times a render of the dashboard as a sequence of sections. The script runs
+    top to bottom, so each call to section ends the previous section and starts
+    the next, and spans opened inside a section (e.g. by chart_helper) nest
+    under it. When profiling is off every method does nothing.
+
+    A render cut short by st.stop, a rerun or an error never reaches finish and
+    leaves its spans open on the script thread, so each profiler starts by
+    clearing them.
+
+    Args:
+        enabled: whether to profile this render
+    """
+
+    def __init__(self, enabled):
+        clear_context()
+        self._stack = ExitStack()
+        self._section = ExitStack()
+        self.run = self._stack.enter_context(pipeline_run('dashboard')) if enabled else None
+
+    def section(self, name):
+        """
+        Ends the current section and starts a new one.
+
+        Args:
+            name: name of the section
+        Returns:
+            None
+        """
+
+        if self.run is None:
+            return
+        self._section.close()
+        self._section.enter_context(span(name))
+
+    def payload(self, obj):
+        """
+        Adds the size of an element about to be sent to the browser to the
+        current section.
+
+        Args:
+            obj: alt.Chart or pl.DataFrame
+        Returns:
+            obj, so calls can be wrapped inline
+        """
+
+        if self.run is not None:
+            add_to_span(payload_bytes=payload_size(obj))
+        return obj
+
+    def finish(self, st):
+        """
+        Ends the render, adds its timings to the percentiles shared by every
+        session, logs those every LOG_EVERY profiled renders and shows a
+        collapsible breakdown at the bottom of the page.
+
+        Args:
+            st: the streamlit module
+        Returns:
+            None
+        """
+
+        global _renders
+
+        if self.run is None:
+            return
+        self._section.close()
+        self._stack.close()
+
+        spans = sorted(self.run.spans, key=lambda s: s.started_at)
+        with _lock:
+            for s in spans:
+                _history[s.path].append(s.wall_seconds)
+            _renders += 1
+            summary = {path: list(seconds) for path, seconds in _history.items()}
+            log = _renders % LOG_EVERY == 0
+
+        rows = [
+            {
+                'section': s.path,
+                'ms': round(s.wall_seconds * 1000, 1),
+                'payload_kb': round(s.payload_bytes / 1024, 1) if s.payload_bytes is not None else None,
+                **{f"p{q}_ms": round(percentile(summary[s.path], q) * 1000, 1) for q in PERCENTILES},
+                'samples': len(summary[s.path]),
+            }
+            for s in spans
+        ]
+        if log:
+            for path, seconds in summary.items():
+                logging.info(
+                    f"Render {path}: "
+                    + ", ".join(f"p{q} {percentile(seconds, q) * 1000:.1f}ms" for q in PERCENTILES)
+                    + f" over {len(seconds)} samples"
+                )
+
+        with st.expander(f"Render profile ({self.run.root.wall_seconds * 1000:,.0f} ms)"):
+            st.dataframe(rows, hide_index=True, width="stretch")
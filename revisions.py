@@ -0,0 +1,182 @@
+import logging
+import duckdb
+import polars as pl
+from datetime import datetime, timedelta
+from data_access import DB_PATH, query
+from instrumentation import span
+from scd2 import MergeResult, merge_scd2, register_frame
+
+REVISIONS_TABLE = "meta.revisions"
+
+REVISION_COLUMNS = ['key_date', 'metric', 'change', 'previous_value', 'current_value', 'source']
+
+# every revised figure of a table, newest first
+REVISED_SQL = f"""
+SELECT as_of, key_date, metric, previous_value, current_value, source
+FROM {REVISIONS_TABLE}
+WHERE table_name = ? AND change = 'revised'
+ORDER BY as_of DESC, key_date DESC, metric
+"""
+
+RECENT_REVISIONS_SQL = f"""
+SELECT *
+FROM ({REVISED_SQL})
+WHERE as_of > ? AND as_of <= ?
+ORDER BY as_of DESC, key_date DESC, metric
+"""
+
+REVISIONS_SCHEMA = {
+    'as_of': pl.Date(), 'key_date': pl.Date(), 'metric': pl.String(),
+    'previous_value': pl.String(), 'current_value': pl.String(), 'source': pl.String()
+}
+
+
+def _compare_keys(previous, current, key_columns, tracked_columns):
+    # returns (added, removed, revised) rows, revised rows carry the previous values suffixed _previous
+    columns = key_columns + tracked_columns + ['source']
+    current = current.select(columns)
+    # line the types up with the new release so equal figures hash equally
+    previous = previous.select(columns).cast(current.schema, strict=False)
+
+    row_hash = pl.struct(tracked_columns).hash().alias('row_hash')
+    current = current.with_columns(row_hash)
+    previous = previous.with_columns(row_hash)
+
+    added = current.join(previous, on=key_columns, how='anti')
+    removed = previous.join(current, on=key_columns, how='anti')
+    revised = (
+        current.join(previous, on=key_columns, how='inner', suffix='_previous')
+        .filter(pl.col('row_hash') != pl.col('row_hash_previous'))
+    )
+    return added, removed, revised
+
+
+def _revision_rows(added, removed, revised, key_columns, tracked_columns):
+    # a figure that is null on both sides is not a revision, so a key whose
+    # tracked values are all null changes the table without adding rows here
+    key = pl.col(key_columns[0]).alias('key_date')
+    frames = []
+    for metric in tracked_columns:
+        value = pl.col(metric).cast(pl.String())
+        previous_value = pl.col(f"{metric}_previous").cast(pl.String())
+        missing = pl.lit(None, dtype=pl.String())
+        frames += [
+            added.filter(pl.col(metric).is_not_null()).select(
+                key, pl.lit(metric).alias('metric'), pl.lit('added').alias('change'),
+                missing.alias('previous_value'), value.alias('current_value'), 'source'
+            ),
+            removed.filter(pl.col(metric).is_not_null()).select(
+                key, pl.lit(metric).alias('metric'), pl.lit('removed').alias('change'),
+                value.alias('previous_value'), missing.alias('current_value'), 'source'
+            ),
+            revised.filter(pl.col(metric).ne_missing(pl.col(f"{metric}_previous"))).select(
+                key, pl.lit(metric).alias('metric'), pl.lit('revised').alias('change'),
+                previous_value.alias('previous_value'), value.alias('current_value'), 'source'
+            ),
+        ]
+
+    return pl.concat(frames).sort('key_date', 'metric')
+
+
+def diff_release(previous, current, key_columns, tracked_columns):
+    """
+    Compares two restatements of a table and lists every figure that was added,
+    removed or revised between them, one row per key and tracked column. Keys
+    only in current are added, keys only in previous are removed, and keys in
+    both are compared on a hash of their tracked columns first, so only rows
+    whose hash differs are compared column by column. Null figures are not
+    listed.
+
+    Args:
+        previous: dataframe with the key, tracked and source columns
+        current: dataframe with the key, tracked and source columns
+        key_columns: business key columns, a single date column
+        tracked_columns: columns whose changes are reported
+    Returns:
+        pl.DataFrame with key_date, metric, change, previous_value, current_value
+        and source columns, values rendered as strings
+    """
+
+    added, removed, revised = _compare_keys(previous, current, key_columns, tracked_columns)
+    return _revision_rows(added, removed, revised, key_columns, tracked_columns)
+
+
+def record_revisions(con, table_name, revisions, as_of):
+    """
+    Appends a diff from diff_release to the revisions table.
+
+    Args:
+        con: an open read-write duckdb connection
+        table_name: the scd table the diff belongs to
+        revisions: output of diff_release
+        as_of: the date the new versions become effective
+    Returns:
+        None
+    """
+
+    register_frame(con, 'revisions_df', revisions)
+    con.execute(f"""
+    INSERT INTO {REVISIONS_TABLE}
+    SELECT ? AS table_name, {', '.join(REVISION_COLUMNS)}, CAST(? AS DATE) AS as_of, ? AS recorded_at
+    FROM revisions_df
+    """, [table_name, as_of, datetime.now()])
+    con.unregister('revisions_df')
+
+
+def merge_release(con, table_name, df, key_columns, tracked_columns, as_of):
+    """
+    Diffs a release against the current rows of its table, records the diff in
+    the revisions table and merges the release with merge_scd2. When no key was
+    added, removed or had its tracked columns changed the merge would not change
+    anything, so it is skipped. That is decided on the keys, not on the diff,
+    which leaves out null figures.
+
+    Args:
+        con: an open read-write duckdb connection
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+        df: prepared dataframe with the key, tracked, source and scd flag columns
+        key_columns: business key columns
+        tracked_columns: columns whose changes create a new version
+        as_of: the date the new versions become effective
+    Returns:
+        MergeResult
+    """
+
+    with span('diff') as s:
+        current = con.execute(
+            f"SELECT {', '.join(key_columns + tracked_columns + ['source'])} FROM {table_name} WHERE is_current = true"
+        ).pl()
+        added, removed, revised = _compare_keys(current, df, key_columns, tracked_columns)
+        revisions = _revision_rows(added, removed, revised, key_columns, tracked_columns)
+        s.add(rows_in=current.height + df.height, rows_out=revisions.height)
+
+    if added.is_empty() and removed.is_empty() and revised.is_empty():
+        logging.info(f"No revisions to {table_name}, skipping merge")
+        return MergeResult(table_name=table_name, inserted=0, expired=0, unchanged=df.height)
+
+    with span('merge') as s:
+        record_revisions(con, table_name, revisions, as_of)
+        logging.info(f"Recorded {revisions.height} revisions to {table_name} in {REVISIONS_TABLE}")
+        result = merge_scd2(con, table_name, df, key_columns, tracked_columns, as_of)
+        s.add(rows_in=df.height, rows_out=result.inserted + result.expired)
+    return result
+
+
+def read_recent_revisions(table_name, until, days=7, db_path=DB_PATH):
+    """
+    Reads the figures revised by releases ingested in the `days` days up to
+    until, newest first.
+
+    Args:
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+        until: last ingest date to include
+        days: length of the window in days
+        db_path: path to the duckdb database file
+    Returns:
+        pl.DataFrame, empty when the database predates the revisions table
+    """
+
+    try:
+        return query(RECENT_REVISIONS_SQL, [table_name, until - timedelta(days=days), until], db_path=db_path)
+    except duckdb.CatalogException:
+        return pl.DataFrame(schema=REVISIONS_SCHEMA)
@@ -0,0 +1,258 @@
+import logging
+from typing import NamedTuple
+
+STAGE_TABLE = "scd2_source"
+# 64 bits round-trip through .pl() as UInt64, unlike a 128 bit hash
+ROW_HASH_TYPE = "UBIGINT"
+# share of a table's rows that may be history sitting among the current rows
+# before a merge reclusters it
+RECLUSTER_FRACTION = 0.2
+
+
+class MergeResult(NamedTuple):
+    table_name: str
+    inserted: int
+    expired: int
+    unchanged: int
+
+    @property
+    def changed(self):
+        return bool(self.inserted or self.expired)
+
+
+def row_hash_sql(tracked_columns):
+    """
+    Builds the expression used to fingerprint the tracked columns of a row. The
+    columns are rendered as a struct before hashing, so a NULL hashes differently
+    from any value (including the string 'NULL') and the comparison is NULL-safe.
+    The hash is the lower 64 bits of the md5, which unlike duckdb's hash() does
+    not change between duckdb versions.
+
+    Args:
+        tracked_columns: columns whose changes create a new version
+    Returns:
+        str
+    """
+
+    fields = ", ".join(f"{c} := {c}" for c in tracked_columns)
+    return f"md5_number_lower(CAST(struct_pack({fields}) AS VARCHAR))"
+
+
+def register_frame(con, view_name, df):
+    """
+    Registers a polars dataframe as a view that can be scanned once. It is
+    handed over as an arrow C stream rather than as the dataframe itself, which
+    duckdb would scan through pyarrow.dataset, importing pandas along the way.
+
+    Args:
+        con: an open duckdb connection
+        view_name: name of the view
+        df: pl.DataFrame
+    Returns:
+        None
+    """
+
+    con.register(view_name, df.__arrow_c_stream__())
+
+
+def key_index_name(table_name):
+    """
+    Name of the ART index on a table's business key, e.g. migrants_arrived_daily_key_idx.
+
+    Args:
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+    Returns:
+        str
+    """
+
+    return f"{table_name.split('.')[-1]}_key_idx"
+
+
+def _create_key_index(con, table_name, key_columns):
+    con.execute(f"CREATE INDEX IF NOT EXISTS {key_index_name(table_name)} ON {table_name} ({', '.join(key_columns)})")
+
+
+def _ensure_row_hash(con, table_name):
+    # adds the row_hash column, or retypes one stored as a 128 bit hash, leaving
+    # it empty so every row is fingerprinted again
+    schema, _, name = table_name.rpartition('.')
+    data_type = con.execute("""
+    SELECT data_type FROM information_schema.columns
+    WHERE table_catalog = current_database() AND table_schema = coalesce(nullif(?, ''), current_schema())
+    AND table_name = ? AND column_name = 'row_hash'
+    """, [schema, name]).fetchone()
+    if data_type is None:
+        con.execute(f"ALTER TABLE {table_name} ADD COLUMN row_hash {ROW_HASH_TYPE}")
+    elif data_type[0] != ROW_HASH_TYPE:
+        # duckdb cannot alter a column of an indexed table, the index is rebuilt by the caller
+        con.execute(f"DROP INDEX IF EXISTS {schema + '.' if schema else ''}{key_index_name(table_name)}")
+        con.execute(f"ALTER TABLE {table_name} ALTER row_hash SET DATA TYPE {ROW_HASH_TYPE} USING NULL")
+        logging.info(f"Changed {table_name}.row_hash to {ROW_HASH_TYPE}")
+
+
+def cluster_scd2(con, table_name, key_columns):
+    """
+    Rewrites a type 2 table ordered by (is_current, key, begin_date), so current
+    rows sit together in the last row groups and a scan filtered on is_current
+    skips the history through zone maps. Rows are reinserted into the same table,
+    so dependent views are kept; the key index is rebuilt afterwards, which is
+    several times faster than maintaining it row by row.
+
+    Args:
+        con: an open read-write duckdb connection
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+        key_columns: business key columns
+    Returns:
+        None
+    """
+
+    schema = table_name.rsplit('.', 1)[0] + '.' if '.' in table_name else ''
+    order_by = ", ".join(['is_current'] + key_columns + ['begin_date', 'record_id'])
+    con.execute(f"CREATE OR REPLACE TEMP TABLE scd2_cluster AS SELECT * FROM {table_name} ORDER BY {order_by}")
+    con.execute(f"DROP INDEX IF EXISTS {schema}{key_index_name(table_name)}")
+    con.execute(f"DELETE FROM {table_name}")
+    con.execute(f"INSERT INTO {table_name} SELECT * FROM scd2_cluster")
+    con.execute("DROP TABLE scd2_cluster")
+    _create_key_index(con, table_name, key_columns)
+
+
+def unclustered_rows(con, table_name):
+    """
+    Counts the history rows stored after the first current row. Merges expire
+    rows where they are and append new versions at the end, so these are the
+    rows a scan filtered on is_current can no longer skip.
+
+    Args:
+        con: an open duckdb connection
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+    Returns:
+        tuple of (unclustered rows, total rows)
+    """
+
+    return con.execute(f"""
+    SELECT
+        count(*) FILTER (WHERE NOT is_current AND rowid > (SELECT min(rowid) FROM {table_name} WHERE is_current)),
+        count(*)
+    FROM {table_name}
+    """).fetchone()
+
+
+def _keys_match(key_columns, left, right):
+    return " AND ".join(f"{left}.{k} IS NOT DISTINCT FROM {right}.{k}" for k in key_columns)
+
+
+def merge_scd2(
+        con,
+        table_name,
+        df,
+        key_columns,
+        tracked_columns,
+        as_of,
+        expire_missing=True,
+        sequence_name='duck_record_sequence',
+        cluster=True
+):
+    """
+    Merges a snapshot into a type 2 slowly changing dimension table. Each current
+    row carries a hash of its tracked columns, so a run compares one hash per key
+    instead of every column, and only touches rows that actually changed:
+
+    - current rows whose hash differs from the snapshot (or that are missing from
+      it, when expire_missing is set) are closed with end_date = as_of - 1 day
+    - snapshot rows without a current version are inserted from as_of onwards
+
+    The snapshot must hold at most one row per key. The table gains a row_hash
+    column and an index on its key the first time it is merged, and existing
+    rows are backfilled. Changed rows are updated in place and new versions
+    appended, the table is only reclustered with cluster_scd2 once more than
+    RECLUSTER_FRACTION of its rows are history stored among current rows.
+
+    Args:
+        con: an open read-write duckdb connection
+        table_name: the scd table, e.g. raw.migrants_arrived_daily
+        df: polars dataframe with the key, tracked, source and scd flag columns
+        key_columns: business key columns
+        tracked_columns: columns whose changes create a new version
+        as_of: the date the new versions become effective
+        expire_missing: expire current rows whose key is not in the snapshot
+        sequence_name: sequence used to assign record ids
+        cluster: recluster the table once it passes RECLUSTER_FRACTION
+    Returns:
+        MergeResult with the table name and inserted, expired and unchanged row counts
+    """
+
+    # make sure every stored row has a fingerprint
+    _ensure_row_hash(con, table_name)
+    con.execute(f"UPDATE {table_name} SET row_hash = {row_hash_sql(tracked_columns)} WHERE row_hash IS NULL")
+    _create_key_index(con, table_name, key_columns)
+
+    # stage the snapshot with the target's column types so hashes line up
+    register_frame(con, 'polarsDF', df)
+    con.execute(f"CREATE OR REPLACE TEMP TABLE {STAGE_TABLE} AS SELECT * FROM {table_name} LIMIT 0")
+    con.execute(f"INSERT INTO {STAGE_TABLE} BY NAME SELECT * FROM polarsDF")
+    con.unregister('polarsDF')
+    con.execute(f"UPDATE {STAGE_TABLE} SET row_hash = {row_hash_sql(tracked_columns)}")
+
+    staged, distinct_keys = con.execute(
+        f"SELECT count(*), count(DISTINCT ({', '.join(key_columns)})) FROM {STAGE_TABLE}"
+    ).fetchone()
+    if staged != distinct_keys:
+        con.execute(f"DROP TABLE {STAGE_TABLE}")
+        raise ValueError(f"Snapshot for {table_name} has duplicate keys on {key_columns}")
+
+    # close current versions that changed or disappeared
+    if expire_missing:
+        expire_condition = f"""NOT EXISTS (
+            SELECT 1 FROM {STAGE_TABLE} AS snapshot
+            WHERE {_keys_match(key_columns, 'snapshot', 'target')}
+            AND snapshot.row_hash = target.row_hash
+        )"""
+    else:
+        expire_condition = f"""EXISTS (
+            SELECT 1 FROM {STAGE_TABLE} AS snapshot
+            WHERE {_keys_match(key_columns, 'snapshot', 'target')}
+            AND snapshot.row_hash <> target.row_hash
+        )"""
+
+    expired = con.execute(f"""
+    UPDATE {table_name} AS target SET
+        end_date    = CAST(? AS DATE) - INTERVAL '1 day',
+        is_current  = false
+    WHERE target.is_current = true
+    AND {expire_condition}
+    """, [as_of]).fetchone()[0]
+
+    # insert a current version for every new or changed key
+    inserted = con.execute(f"""
+    INSERT INTO {table_name} BY NAME
+    SELECT
+        nextval('{sequence_name}') AS record_id,
+        snapshot.* EXCLUDE (record_id)
+    FROM {STAGE_TABLE} AS snapshot
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {table_name} AS target
+        WHERE target.is_current = true
+        AND {_keys_match(key_columns, 'snapshot', 'target')}
+    )
+    ORDER BY {', '.join(f'snapshot.{k} DESC' for k in key_columns)}
+    """).fetchone()[0]
+
+    con.execute(f"DROP TABLE {STAGE_TABLE}")
+
+    if cluster and (inserted or expired):
+        unclustered, rows = unclustered_rows(con, table_name)
+        if unclustered > RECLUSTER_FRACTION * rows:
+            logging.info(f"Reclustering {table_name}, {unclustered} of {rows} rows out of place")
+            cluster_scd2(con, table_name, key_columns)
+
+    result = MergeResult(
+        table_name=table_name,
+        inserted=inserted,
+        expired=expired,
+        unchanged=staged - inserted
+    )
+    logging.info(
+        f"Merged {table_name}: {result.inserted} inserted, "
+        f"{result.expired} expired, {result.unchanged} unchanged"
+    )
+    return result
@@ -0,0 +1,103 @@
+import logging
+import duckdb
+import polars as pl
+from datetime import date
+from pathlib import Path
+from latest_tables import LATEST_TABLES, latest_table_sql
+from point_in_time import AS_OF_MACROS_SQL, HISTORY_TABLES
+from scd2 import register_frame
+
+QUERIES_PATH = Path(__file__).parent / 'queries'
+
+# columns the merge fills in itself rather than taking from the ingest
+MERGE_COLUMNS = {'record_id', 'row_hash'}
+
+
+def _prepared_frames():
+    # what each ingest writes, produced by its own prepare step from an empty sheet
+    import ingest_7_day_data
+    import ingest_daily_data
+    import ingest_weekly_data
+
+    as_of = date.today()
+    yield ingest_daily_data.TABLE_NAME, ingest_daily_data.prepare_daily_data(
+        [pl.DataFrame(schema=ingest_daily_data.SCHEMA_OVERRIDES | {'source': pl.String()})], as_of
+    )
+    yield ingest_weekly_data.TABLE_NAME, ingest_weekly_data.prepare_weekly_data(
+        [pl.DataFrame(schema=ingest_weekly_data.SCHEMA_OVERRIDES | {'source': pl.String()})], as_of
+    )
+    yield ingest_7_day_data.TABLE_NAME, ingest_7_day_data.prepare_seven_day_data(
+        pl.DataFrame(schema=ingest_7_day_data.SCHEMA_OVERRIDES), as_of
+    )
+
+
+def check_ingest_schemas():
+    """
+    Checks the DDL in queries/ against the columns the ingest modules write,
+    using a throwaway in-memory database. Every column an ingest writes must
+    exist in its raw table and cast to it, every raw column must be written
+    (apart from those the merge fills in), and the latest tables, as_of macro
+    and kpi summary must bind against the result.
+
+    Args:
+        None
+    Returns:
+        None
+    Raises:
+        ValueError: listing every mismatch found
+    """
+
+    problems = []
+    con = duckdb.connect()
+    try:
+        con.execute((QUERIES_PATH / 'create_raw_table_statements.sql').read_text())
+
+        for table_name, df in _prepared_frames():
+            ddl_columns = {row[0] for row in con.execute(f"DESCRIBE {table_name}").fetchall()}
+            written = set(df.columns)
+            for column in sorted(written - ddl_columns):
+                problems.append(f"{table_name}: ingest writes {column}, which the DDL does not define")
+            for column in sorted(ddl_columns - written - MERGE_COLUMNS):
+                problems.append(f"{table_name}: DDL defines {column}, which the ingest never writes")
+
+            # the merge stages with INSERT BY NAME, so this is the cast it will make
+            if written <= ddl_columns:
+                try:
+                    register_frame(con, 'prepared', df)
+                    con.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM prepared")
+                except duckdb.Error as e:
+                    problems.append(f"{table_name}: ingest output does not cast to the DDL -> {e}")
+                finally:
+                    con.unregister('prepared')
+
+        for latest_table in LATEST_TABLES:
+            try:
+                con.execute(f"CREATE TABLE {latest_table} AS ({latest_table_sql(latest_table)})")
+            except duckdb.Error as e:
+                problems.append(f"{latest_table}: query does not bind -> {e}")
+
+        con.execute(AS_OF_MACROS_SQL)
+        for table_name in HISTORY_TABLES:
+            try:
+                con.execute(f"DESCRIBE SELECT * FROM as_of('{table_name}', current_date)")
+            except duckdb.Error as e:
+                problems.append(f"as_of({table_name}) does not bind -> {e}")
+
+        try:
+            con.execute(f"DESCRIBE {(QUERIES_PATH / 'kpi_summary.sql').read_text()}")
+        except duckdb.Error as e:
+            problems.append(f"kpi_summary.sql does not bind -> {e}")
+    finally:
+        con.close()
+
+    if problems:
+        raise ValueError("Schema mismatch:\n" + "\n".join(problems))
+    logging.info("Ingest schemas match the DDL")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    check_ingest_schemas()
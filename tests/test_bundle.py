@@ -0,0 +1,25 @@
+import json
+import os
+from bundle import KEEP_VERSIONS, MANIFEST_NAME, publish_bundle
+
+
+def _version(bundle_dir, name, mtime):
+    path = bundle_dir / name
+    path.mkdir()
+    os.utime(path, ns=(mtime, mtime))
+    return path
+
+
+def test_publish_prunes_old_versions_and_sweeps_partials(tmp_path):
+    old = [_version(tmp_path, f"old{i}", i) for i in range(KEEP_VERSIONS + 1)]
+    # a newer partial directory must not push a completed version out
+    partial = _version(tmp_path, "abandoned.partial", 10**18)
+    current = _version(tmp_path, "current", 10**18 + 1)
+
+    publish_bundle({'version': 'current', 'created_at': '2026-01-14T09:00:00'}, tmp_path)
+
+    assert json.loads((tmp_path / MANIFEST_NAME).read_text())['version'] == 'current'
+    assert not partial.exists()
+    assert current.exists()
+    kept = sorted(p.name for p in tmp_path.iterdir() if p.is_dir())
+    assert kept == sorted(['current'] + [p.name for p in old[-(KEEP_VERSIONS - 1):]])
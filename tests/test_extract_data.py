@@ -0,0 +1,155 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from extract_data import DOWNLOAD_TEXT, fetch_migrant_data
+
+ODS_BYTES = b"not really an ods, only its bytes are compared"
+SEVEN_DAY_HTML = "<html><body><table><tr><th>Date</th></tr></table></body></html>"
+ETAG = '"v1"'
+LAST_MODIFIED = "Tue, 13 Jan 2026 09:30:00 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # set per test by the server fixture: path -> (body, send validators), or None for a 500
+    routes = {}
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, dict(self.headers)))
+        if self.path not in self.routes:
+            self.send_error(404)
+            return
+        if self.routes[self.path] is None:
+            self.send_error(500)
+            return
+        body, validators = self.routes[self.path]
+        if validators and self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if validators:
+            self.send_header('ETag', ETAG)
+            self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    _Handler.requests = []
+    _Handler.routes = {
+        '/publication': (f'<a href="/files/time-series.ods">{DOWNLOAD_TEXT}</a>'.encode(), False),
+        '/files/time-series.ods': (ODS_BYTES, True),
+        '/seven-day': (SEVEN_DAY_HTML.encode(), True),
+    }
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield base_url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _fetch(base_url, tmp_path, cache=None, seven_day_path='/seven-day'):
+    return fetch_migrant_data(
+        url=f"{base_url}/publication",
+        seven_day_url=f"{base_url}{seven_day_path}",
+        incoming_path=tmp_path,
+        cache=cache
+    )
+
+
+def test_first_fetch_downloads_both_sources(server, tmp_path):
+    fetched = _fetch(server, tmp_path)
+
+    assert fetched.ods_changed and fetched.seven_day_changed
+    assert not fetched.ods_failed and not fetched.seven_day_failed
+    assert fetched.ods_path == tmp_path / 'time-series.ods'
+    assert fetched.ods_path.read_bytes() == ODS_BYTES
+    assert fetched.seven_day_html == SEVEN_DAY_HTML
+    assert not list(tmp_path.glob('*.part'))
+
+    entries = {e.url: e for e in fetched.cache_entries}
+    assert entries[f"{server}/files/time-series.ods"].etag == ETAG
+    assert entries[f"{server}/files/time-series.ods"].last_modified == LAST_MODIFIED
+    assert entries[f"{server}/files/time-series.ods"].content_hash == hashlib.sha256(ODS_BYTES).hexdigest()
+
+
+def test_second_fetch_is_conditional_and_not_modified(server, tmp_path):
+    first = _fetch(server, tmp_path / 'first')
+    fetched = _fetch(server, tmp_path / 'second', cache={e.url: e for e in first.cache_entries})
+
+    assert not fetched.ods_changed and not fetched.seven_day_changed
+    assert fetched.ods_path is None and fetched.seven_day_html is None
+    assert not (tmp_path / 'second').exists() or not list((tmp_path / 'second').iterdir())
+
+    conditional = [headers for path, headers in _Handler.requests[-3:] if path != '/publication']
+    assert len(conditional) == 2
+    for headers in conditional:
+        assert headers['If-None-Match'] == ETAG
+        assert headers['If-Modified-Since'] == LAST_MODIFIED
+
+
+def test_unchanged_content_hash_counts_as_unchanged(server, tmp_path):
+    # without validators the server always answers 200 with the full body
+    _Handler.routes['/files/time-series.ods'] = (ODS_BYTES, False)
+    _Handler.routes['/seven-day'] = (SEVEN_DAY_HTML.encode(), False)
+    first = _fetch(server, tmp_path)
+    (tmp_path / 'time-series.ods').unlink()
+
+    fetched = _fetch(server, tmp_path, cache={e.url: e for e in first.cache_entries})
+
+    assert not fetched.ods_changed and not fetched.seven_day_changed
+    assert fetched.ods_path is None and fetched.seven_day_html is None
+    assert not list(tmp_path.iterdir())
+    assert {e.content_hash for e in fetched.cache_entries} == {e.content_hash for e in first.cache_entries}
+
+
+def test_failed_source_does_not_stop_the_other(server, tmp_path):
+    fetched = _fetch(server, tmp_path, seven_day_path='/missing')
+
+    assert fetched.seven_day_failed
+    assert not fetched.seven_day_changed
+    assert fetched.seven_day_html is None
+    assert not fetched.ods_failed
+    assert fetched.ods_changed
+    assert fetched.ods_path.read_bytes() == ODS_BYTES
+    assert [e.url for e in fetched.cache_entries] == [f"{server}/files/time-series.ods"]
+
+
+def test_failed_download_is_reported_as_failed(server, tmp_path):
+    _Handler.routes['/files/time-series.ods'] = None
+
+    fetched = _fetch(server, tmp_path)
+
+    assert fetched.ods_failed
+    assert not fetched.ods_changed
+    assert fetched.ods_path is None
+    assert not list(tmp_path.glob('*'))
+    assert fetched.seven_day_changed and not fetched.seven_day_failed
+    assert [e.url for e in fetched.cache_entries] == [f"{server}/seven-day"]
+
+
+def test_failed_download_fails_the_run(server, tmp_path, monkeypatch):
+    import execute_all
+    import extract_data
+
+    _Handler.routes['/files/time-series.ods'] = None
+    first = _fetch(server, tmp_path / 'first')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        extract_data, 'fetch_migrant_data',
+        lambda cache: _fetch(server, tmp_path, cache={e.url: e for e in first.cache_entries})
+    )
+
+    # the 7-day page is unchanged, so without the release there is nothing to ingest
+    with pytest.raises(RuntimeError, match="could not be downloaded"):
+        execute_all.execute_all()
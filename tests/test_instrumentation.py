@@ -0,0 +1,60 @@
+import duckdb
+import pytest
+from ingest_manifest import ensure_meta_tables
+from instrumentation import (
+    PIPELINE_RUNS_TABLE, add_to_span, pipeline_run, record_pipeline_run, span, spool_pipeline_run
+)
+
+
+def test_spans_nest_and_are_recorded():
+    con = duckdb.connect()
+    ensure_meta_tables(con)
+
+    with pipeline_run('ingest') as run:
+        with span('fetch'):
+            add_to_span(bytes_downloaded=100)
+            add_to_span(bytes_downloaded=28)
+        with span('render'):
+            add_to_span(payload_bytes=0)
+        with pytest.raises(ValueError), span('merge'):
+            add_to_span(rows_in=3)
+            raise ValueError("bad release")
+        record_pipeline_run(con, run)
+
+    rows = con.execute(f"""
+    SELECT span, parent, status, rows_in, bytes_downloaded, payload_bytes, process_peak_rss_bytes > 0
+    FROM {PIPELINE_RUNS_TABLE} ORDER BY started_at
+    """).fetchall()
+    assert rows == [
+        ('ingest', None, 'ok', None, None, None, True),
+        ('ingest/fetch', 'ingest', 'ok', None, 128, None, True),
+        ('ingest/render', 'ingest', 'ok', None, None, 0, True),
+        ('ingest/merge', 'ingest', 'failed', 3, None, None, True),
+    ]
+
+
+def test_spooled_runs_are_recorded_once(tmp_path):
+    con = duckdb.connect()
+    ensure_meta_tables(con)
+    spool_path = tmp_path / 'runs.jsonl'
+
+    with pipeline_run('unchanged') as unchanged:
+        with span('fetch'):
+            add_to_span(bytes_downloaded=10)
+        spool_pipeline_run(unchanged, spool_path)
+
+    # the spool survives when a publish dies before removing it
+    for name in ('changed', 'changed again'):
+        with pipeline_run(name) as run:
+            record_pipeline_run(con, run, spool_path)
+
+    rows = con.execute(f"""
+    SELECT run_name, span, bytes_downloaded, started_at <= recorded_at
+    FROM {PIPELINE_RUNS_TABLE} ORDER BY started_at
+    """).fetchall()
+    assert rows == [
+        ('unchanged', 'unchanged', None, True),
+        ('unchanged', 'unchanged/fetch', 10, True),
+        ('changed', 'changed', None, True),
+        ('changed again', 'changed again', None, True),
+    ]
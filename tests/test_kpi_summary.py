@@ -0,0 +1,25 @@
+from datetime import date
+import polars as pl
+from kpi_summary import compute_kpi_summary
+
+SCHEMA = {'date_ending': pl.Date(), 'migrants_arrived': pl.Int64()}
+
+
+def test_summary_of_empty_frames_is_none():
+    daily = pl.DataFrame({'date_ending': [date(2026, 1, 12)], 'migrants_arrived': [32]}, schema=SCHEMA)
+    empty = pl.DataFrame(schema=SCHEMA)
+
+    assert compute_kpi_summary(empty, empty) is None
+    assert compute_kpi_summary(daily, empty) is None
+
+
+def test_summary_of_one_day():
+    daily = pl.DataFrame({'date_ending': [date(2026, 1, 12)], 'migrants_arrived': [32]}, schema=SCHEMA)
+    seven_day = pl.DataFrame({'date_ending': [date(2026, 1, 13)], 'migrants_arrived': [0]}, schema=SCHEMA)
+
+    kpi = compute_kpi_summary(daily, seven_day)
+
+    assert kpi['latest_preliminary_date'] == date(2026, 1, 13)
+    assert kpi['latest_date'] == date(2026, 1, 12)
+    assert kpi['current_week_total_migrants_arrived'] == 32
+    assert kpi['current_year_total_migrants_arrived'] == 32
@@ -0,0 +1,55 @@
+import shutil
+from pathlib import Path
+import duckdb
+from data_access import database_version
+from instrumentation import PIPELINE_RUNS_TABLE, read_spooled_runs, runs_spool_path
+from ingest_manifest import ensure_meta_tables
+from publish import run_standalone
+from scd2 import MergeResult
+
+DB_PATH = Path(__file__).parent.parent / 'migrant_crossings_db.duckdb'
+
+
+def _copy_database(tmp_path):
+    db_path = str(tmp_path / DB_PATH.name)
+    shutil.copyfile(DB_PATH, db_path)
+    return db_path
+
+
+def _recorded_runs(db_path):
+    with duckdb.connect(db_path, read_only=True) as con:
+        return con.execute(
+            f"SELECT run_name FROM {PIPELINE_RUNS_TABLE} WHERE parent IS NULL ORDER BY started_at"
+        ).fetchall()
+
+
+def test_unchanged_run_publishes_nothing(tmp_path):
+    db_path = _copy_database(tmp_path)
+    version = database_version(db_path)
+
+    def unchanged(con):
+        ensure_meta_tables(con)
+        return MergeResult('raw.migrants_arrived_daily', inserted=0, expired=0, unchanged=5)
+
+    assert run_standalone('unchanged', unchanged, db_path) is not None
+
+    assert database_version(db_path) == version
+    assert {row[1] for row in read_spooled_runs(runs_spool_path(db_path))} == {'unchanged'}
+
+
+def test_changed_run_publishes_the_spooled_runs(tmp_path):
+    db_path = _copy_database(tmp_path)
+
+    def unchanged(con):
+        ensure_meta_tables(con)
+        return MergeResult('raw.migrants_arrived_daily', inserted=0, expired=0, unchanged=5)
+
+    def changed(con):
+        ensure_meta_tables(con)
+        return MergeResult('raw.migrants_arrived_daily', inserted=1, expired=1, unchanged=4)
+
+    run_standalone('unchanged', unchanged, db_path)
+    run_standalone('changed', changed, db_path)
+
+    assert _recorded_runs(db_path) == [('unchanged',), ('changed',)]
+    assert not Path(runs_spool_path(db_path)).exists()
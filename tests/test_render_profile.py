@@ -0,0 +1,46 @@
+from instrumentation import span
+from render_profile import RenderProfiler
+
+
+class _Streamlit:
+    # stands in for the streamlit module, finish only renders an expander
+    def expander(self, label):
+        return self
+
+    def dataframe(self, data, **kwargs):
+        self.rows = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_render_cut_short_does_not_leak_into_the_next():
+    aborted = RenderProfiler(True)
+    aborted.section('headline metrics')
+    # the script stops here, e.g. on st.stop or a rerun, and finish never runs
+
+    profiler = RenderProfiler(True)
+    profiler.section('charts')
+    with span('time_series_chart_maker'):
+        pass
+    st = _Streamlit()
+    profiler.finish(st)
+
+    assert [row['section'] for row in st.rows] == [
+        'dashboard', 'dashboard/charts', 'dashboard/charts/time_series_chart_maker'
+    ]
+    assert aborted.run.spans == []
+
+
+def test_disabled_render_clears_a_stale_run():
+    RenderProfiler(True).section('headline metrics')
+
+    profiler = RenderProfiler(False)
+    with span('orphan') as s:
+        pass
+
+    assert profiler.run is None
+    assert s.parent is None
@@ -0,0 +1,100 @@
+from datetime import date
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+from ingest_daily_data import KEY_COLUMNS, TABLE_NAME, TRACKED_COLUMNS, prepare_daily_data
+from ingest_manifest import ensure_meta_tables
+from revisions import REVISIONS_TABLE, diff_release, merge_release
+from scd2 import unclustered_rows
+
+RAW_TABLES_SQL = Path(__file__).parent.parent / 'queries' / 'create_raw_table_statements.sql'
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    con.sql(RAW_TABLES_SQL.read_text())
+    ensure_meta_tables(con)
+    yield con
+    con.close()
+
+
+def _release(rows, source):
+    return pl.DataFrame(
+        rows,
+        schema=['Date', 'Migrants arrived', 'Boats arrived',
+                'Boats arrived - involved in uncontrolled landings', 'Notes'],
+        orient='row'
+    ).with_columns(pl.lit(source).alias('source'))
+
+
+def _current(con):
+    return con.execute(
+        f"SELECT date_ending, migrants_arrived FROM {TABLE_NAME} WHERE is_current ORDER BY date_ending"
+    ).fetchall()
+
+
+def test_revised_figure_is_recorded_and_merged(con):
+    merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(date(2026, 1, 1), 10, 1, 0, None), (date(2026, 1, 2), 20, 2, 0, None)], 'a.ods'
+    )], date(2026, 1, 3)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 3))
+
+    result = merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(date(2026, 1, 1), 10, 1, 0, None), (date(2026, 1, 2), 25, 2, 0, None)], 'b.ods'
+    )], date(2026, 1, 4)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 4))
+
+    assert (result.inserted, result.expired) == (1, 1)
+    assert _current(con) == [(date(2026, 1, 1), 10), (date(2026, 1, 2), 25)]
+    assert con.execute(
+        f"SELECT key_date, metric, previous_value, current_value FROM {REVISIONS_TABLE} WHERE change = 'revised'"
+    ).fetchall() == [(date(2026, 1, 2), 'migrants_arrived', '20', '25')]
+
+
+def test_all_null_rows_are_merged_without_revisions(con):
+    merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(date(2026, 1, 1), 10, 1, 0, None), (date(2026, 1, 2), None, None, None, None)], 'a.ods'
+    )], date(2026, 1, 3)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 3))
+
+    # a new all-null date is added and the old all-null date is dropped
+    df = prepare_daily_data([_release(
+        [(date(2026, 1, 1), 10, 1, 0, None), (date(2026, 1, 3), None, None, None, None)], 'b.ods'
+    )], date(2026, 1, 4))
+    revisions = diff_release(
+        con.execute(f"SELECT * FROM {TABLE_NAME} WHERE is_current").pl(), df, KEY_COLUMNS, TRACKED_COLUMNS
+    )
+    assert revisions.is_empty()
+
+    result = merge_release(con, TABLE_NAME, df, KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 4))
+
+    assert (result.inserted, result.expired) == (1, 1)
+    assert _current(con) == [(date(2026, 1, 1), 10), (date(2026, 1, 3), None)]
+
+
+def test_unchanged_release_skips_the_merge(con):
+    df = prepare_daily_data([_release([(date(2026, 1, 1), 10, 1, 0, None)], 'a.ods')], date(2026, 1, 3))
+    merge_release(con, TABLE_NAME, df, KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 3))
+
+    result = merge_release(con, TABLE_NAME, df, KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 4))
+
+    assert not result.changed
+    assert con.execute(f"SELECT count(*) FROM {TABLE_NAME}").fetchone() == (1,)
+
+
+def test_merges_append_until_the_table_needs_reclustering(con):
+    days = [date(2026, 1, d) for d in range(1, 21)]
+    merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(d, 10, 1, 0, None) for d in days], 'a.ods'
+    )], date(2026, 2, 1)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 2, 1))
+
+    # one revised date leaves one history row among the current rows, in place
+    merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(d, 11 if d == days[0] else 10, 1, 0, None) for d in days], 'b.ods'
+    )], date(2026, 2, 2)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 2, 2))
+    assert unclustered_rows(con, TABLE_NAME) == (1, 21)
+
+    # revising most dates passes the threshold and reclusters the table
+    merge_release(con, TABLE_NAME, prepare_daily_data([_release(
+        [(d, 12, 1, 0, None) for d in days], 'c.ods'
+    )], date(2026, 2, 3)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 2, 3))
+    assert unclustered_rows(con, TABLE_NAME) == (0, 41)
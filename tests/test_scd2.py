@@ -0,0 +1,65 @@
+from datetime import date
+from pathlib import Path
+import duckdb
+import polars as pl
+import pytest
+from ingest_daily_data import KEY_COLUMNS, TABLE_NAME, TRACKED_COLUMNS
+from scd2 import key_index_name, merge_scd2
+
+RAW_TABLES_SQL = Path(__file__).parent.parent / 'queries' / 'create_raw_table_statements.sql'
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    con.sql(RAW_TABLES_SQL.read_text())
+    yield con
+    con.close()
+
+
+def _snapshot(migrants, as_of):
+    return pl.DataFrame({
+        'date_ending': [date(2026, 1, 1), date(2026, 1, 2)],
+        'migrants_arrived': migrants,
+        'boats_arrived': [1, None],
+        'boats_arrived_involved_in_uncontrolled_landings': [0, None],
+        'notes': [None, None],
+        'source': ['a.ods', 'a.ods'],
+        'is_current': [True, True],
+        'begin_date': [as_of, as_of],
+        'end_date': pl.Series([None, None], dtype=pl.Date()),
+    })
+
+
+def test_row_hash_round_trips_through_polars(con):
+    merge_scd2(con, TABLE_NAME, _snapshot([10, None], date(2026, 1, 3)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 3))
+
+    df = con.execute(f"SELECT * FROM {TABLE_NAME}").pl()
+    assert df.schema['row_hash'] == pl.UInt64()
+    assert df['row_hash'].null_count() == 0
+    assert con.execute(
+        f"SELECT count(*) FROM {TABLE_NAME} JOIN df USING (record_id, row_hash)"
+    ).fetchone() == (2,)
+
+
+def test_wide_row_hash_is_migrated_without_new_versions(con):
+    merge_scd2(con, TABLE_NAME, _snapshot([10, None], date(2026, 1, 3)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 3))
+    # tables merged before the hash was narrowed stored the full 128 bit md5
+    fields = ", ".join(f"{c} := {c}" for c in TRACKED_COLUMNS)
+    con.execute(f"DROP INDEX {TABLE_NAME.split('.')[0]}.{key_index_name(TABLE_NAME)}")
+    con.execute(f"ALTER TABLE {TABLE_NAME} ALTER row_hash SET DATA TYPE UHUGEINT")
+    con.execute(f"UPDATE {TABLE_NAME} SET row_hash = md5_number(CAST(struct_pack({fields}) AS VARCHAR))")
+    con.execute(f"CREATE INDEX {key_index_name(TABLE_NAME)} ON {TABLE_NAME} (date_ending)")
+
+    result = merge_scd2(
+        con, TABLE_NAME, _snapshot([10, None], date(2026, 1, 4)), KEY_COLUMNS, TRACKED_COLUMNS, date(2026, 1, 4)
+    )
+
+    assert not result.changed
+    assert con.execute(
+        "SELECT data_type FROM information_schema.columns WHERE table_name = 'migrants_arrived_daily' "
+        "AND column_name = 'row_hash'"
+    ).fetchone() == ('UBIGINT',)
+    assert con.execute(
+        f"SELECT count(*) FROM duckdb_indexes() WHERE index_name = '{key_index_name(TABLE_NAME)}'"
+    ).fetchone() == (1,)